@@ -0,0 +1,258 @@
+"""
+Approximate nearest-neighbor search over the embedding store (inverted file
+index, IVF). The normalized vectors are clustered with spherical k-means; each
+word is assigned to the list of its closest centroid. A query is scored against
+the centroids first, and only the words of the nprobe closest lists are scored
+exactly, instead of every row of the store.
+
+The index is built by the build_ann_index command, saved next to the version of
+the embedding store it was built from and memory-mapped like the store itself.
+The benchmark_ann command measures recall and latency against exact search for
+different values of nprobe.
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+
+from .embeddings import normalize_rows
+from .settings import ann_nprobe
+from .similarity import get_engine
+
+INDEX_DIR = "ivf"
+CENTROIDS_FILE = "centroids.npy"
+OFFSETS_FILE = "offsets.npy"
+ROWS_FILE = "rows.npy"
+META_FILE = "meta.json"
+
+# rows that are scored at once when assigning vectors to centroids
+_CHUNK_SIZE = 65536
+
+
+def _assign(vectors, centroids):
+    """
+    Returns:
+        assignments: index of the closest centroid of every vector
+    """
+    assignments = np.empty(len(vectors), dtype=np.int32)
+
+    for start in range(0, len(vectors), _CHUNK_SIZE):
+        chunk = np.asarray(vectors[start : start + _CHUNK_SIZE], dtype=np.float32)
+        assignments[start : start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+
+    return assignments
+
+
+def kmeans(vectors, lists, iterations=10, sample_size=100000, seed=0):
+    """
+    Clusters normalized vectors with spherical k-means on a random sample
+
+    Parameters:
+        vectors: normalized matrix (may be memory-mapped)
+        lists: number of clusters
+        iterations: number of k-means iterations
+        sample_size: number of vectors the centroids are trained on
+        seed: seed of the random sample and initialization
+
+    Returns:
+        centroids: normalized float32 matrix of shape (lists, dimensions)
+    """
+    rng = np.random.default_rng(seed)
+
+    sample_rows = np.sort(rng.choice(len(vectors), min(sample_size, len(vectors)), replace=False))
+    sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+    lists = min(lists, len(sample))
+
+    centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _assign(sample, centroids)
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=lists)
+
+        # restart empty clusters at random vectors of the sample
+        empty = counts == 0
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted lists of the rows of an embedding store. The rows of list i are
+    rows[offsets[i] : offsets[i + 1]].
+    """
+
+    def __init__(self, centroids, offsets, rows, directory=None):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+        self.directory = directory
+
+    @classmethod
+    def build(cls, vectors, lists, iterations=10, sample_size=100000, seed=0):
+        """
+        Builds an index over the normalized vectors of an embedding store
+
+        Returns:
+            index: IVFIndex
+        """
+        centroids = kmeans(vectors, lists, iterations, sample_size, seed)
+        assignments = _assign(vectors, centroids)
+
+        rows = np.argsort(assignments, kind="stable").astype(np.int32)
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assignments, minlength=len(centroids)))
+
+        return cls(centroids, offsets, rows)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        mmap_mode = "r" if mmap else None
+
+        return cls(
+            np.load(os.path.join(directory, CENTROIDS_FILE)),
+            np.load(os.path.join(directory, OFFSETS_FILE)),
+            np.load(os.path.join(directory, ROWS_FILE), mmap_mode=mmap_mode),
+            directory,
+        )
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+
+        for name, array in (
+            (CENTROIDS_FILE, self.centroids),
+            (OFFSETS_FILE, self.offsets),
+            (ROWS_FILE, self.rows),
+        ):
+            path = os.path.join(directory, name)
+
+            with open(path + ".tmp", "wb") as file:
+                np.save(file, array)
+
+            os.replace(path + ".tmp", path)
+
+        with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as file:
+            json.dump({"lists": len(self.centroids), "rows": len(self.rows)}, file)
+
+        self.directory = directory
+
+    @property
+    def lists(self):
+        return len(self.centroids)
+
+    def candidates(self, query, nprobe):
+        """
+        Returns:
+            rows: rows of the nprobe lists whose centroids are closest to query
+        """
+        nprobe = min(nprobe, self.lists)
+        scores = self.centroids @ query
+        probed = np.argpartition(-scores, nprobe - 1)[:nprobe]
+
+        return np.concatenate([self.rows[self.offsets[i] : self.offsets[i + 1]] for i in probed])
+
+    def search(self, vectors, query, k, nprobe=ann_nprobe, exclude=None):
+        """
+        Returns the approximate k nearest neighbors of a query
+
+        Parameters:
+            vectors: normalized matrix the index was built from
+            query: normalized float32 vector
+            k: number of neighbors
+            nprobe: number of lists that are scanned (more lists = higher recall)
+            exclude: row that is not returned (e.g. the query word itself)
+
+        Returns:
+            rows: int32 array of rows, ordered from most to least similar
+            scores: similarities of the rows
+        """
+        # sorted rows read the memory-mapped matrix front to back
+        candidates = np.sort(self.candidates(query, nprobe))
+
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+
+        scores = np.asarray(vectors[candidates], dtype=np.float32) @ query
+
+        k = min(k, len(candidates))
+
+        if k == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+
+        return candidates[best].astype(np.int32), scores[best]
+
+
+def _directory(store):
+    return os.path.join(store.directory, INDEX_DIR)
+
+
+def build_index(lists, iterations=10, sample_size=100000, seed=0):
+    """
+    Builds and saves the index of the current embedding store
+
+    Returns:
+        index: IVFIndex
+    """
+    engine = get_engine()
+
+    index = IVFIndex.build(engine.vectors, lists, iterations, sample_size, seed)
+    index.save(_directory(engine.store))
+
+    return index
+
+
+_index = None
+_index_store = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Returns:
+        index: IVFIndex of the current embedding store or None if it has not been built
+    """
+    global _index, _index_store
+
+    store = get_engine().store
+
+    if _index_store is not store:
+        with _lock:
+            if _index_store is not store:
+                directory = _directory(store)
+                _index = (
+                    IVFIndex.load(directory)
+                    if os.path.exists(os.path.join(directory, META_FILE))
+                    else None
+                )
+                _index_store = store
+
+    return _index
+
+
+def nearest(target_row, k, nprobe=ann_nprobe):
+    """
+    Returns the approximate k nearest neighbors of a word of the embedding store,
+    or None if no index has been built for the current store
+
+    Returns:
+        rows: int32 array of rows, ordered from most to least similar
+    """
+    index = get_index()
+
+    if index is None:
+        return None
+
+    engine = get_engine()
+    query = np.asarray(engine.vectors[target_row], dtype=np.float32)
+
+    return index.search(engine.vectors, query, k, nprobe, exclude=target_row)[0]
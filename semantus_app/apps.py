@@ -1,5 +1,61 @@
+import logging
+import os
+import sys
+
 from django.apps import AppConfig
 
+logger = logging.getLogger(__name__)
+
+
 class SemantusAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'semantus_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .settings import warm_up
+
+        if not warm_up or not self._serves_requests():
+            return
+
+        from . import lemmatizer, similarity, tokens
+
+        # load the language model once per worker instead of on the first guess
+        try:
+            lemmatizer.warm_up()
+        except Exception as e:
+            logger.warning("Could not warm up lemmatizer: %s", e)
+
+        # map the embedding store and normalize it if necessary
+        try:
+            similarity.get_engine()
+        except Exception as e:
+            logger.warning("Could not load embedding store: %s", e)
+
+        # fetch the certificates that firebase tokens are signed with
+        try:
+            tokens.get_verifier().prefetch()
+        except Exception as e:
+            logger.warning("Could not prefetch token certificates: %s", e)
+
+    def _serves_requests(self):
+        """
+        Returns:
+            serves: False for management commands that do not serve requests
+                (e.g. migrate), True for servers (gunicorn, uvicorn, daphne, ...)
+        """
+        from .settings import warm_up_commands
+
+        name = os.path.basename(sys.argv[0])
+        package = os.path.basename(os.path.dirname(sys.argv[0]))
+
+        # manage.py, django-admin or python -m django
+        is_command = name in ("manage.py", "django-admin") or (name, package) == (
+            "__main__.py",
+            "django",
+        )
+
+        if not is_command:
+            return True
+
+        return len(sys.argv) > 1 and sys.argv[1] in warm_up_commands
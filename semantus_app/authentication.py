@@ -3,11 +3,123 @@ This file defines authentication methods that will be used by the API. In
 particular, we use Firebase authentication tokens to verify the identity
 of users. Users will have to obtain their firebase token on the client side
 and send it as a header with each request.
+
+Verified tokens are memoized per request and cached per worker (see tokens.py),
+and users are cached for a short time, so that authenticated requests usually
+do not query the database for the identity of the user.
 """
 
-from django.contrib.auth.models import User
-from rest_framework import authentication
-import firebase_admin.auth as auth
+import copy
+
+from rest_framework import authentication, exceptions
+
+from .caches import LRUCache
+from .executors import run_io
+from .models import UserData
+from .settings import user_cache_size, user_cache_ttl
+from .tokens import verify_token
+
+user_cache = LRUCache("users", user_cache_size)
+
+
+def get_claims(request):
+    """
+    Verifies the firebase token passed in the request header. The result is
+    memoized on the request.
+
+    Returns:
+        claims: decoded claims of the token or None if no token is provided
+
+    Raises:
+        AuthenticationFailed: if the token is invalid
+    """
+    http_request = getattr(request, "_request", request)
+
+    if hasattr(http_request, "firebase_claims"):
+        return http_request.firebase_claims
+
+    token = request.headers.get("Authorization")
+
+    # if no token is provided, the request is not authenticated
+    if not token:
+        claims = None
+
+    else:
+        if token.startswith("Bearer "):
+            token = token[len("Bearer ") :]
+
+        # if the token is invalid, verify_token will throw an exception
+        try:
+            claims = verify_token(token)
+        except Exception:
+            raise exceptions.AuthenticationFailed("Invalid firebase token provided.")
+
+    http_request.firebase_claims = claims
+    return claims
+
+
+def get_user(uid):
+    """
+    Returns the user with the given firebase id. Users are cached for
+    user_cache_ttl seconds (and invalidated when they are saved).
+
+    Parameters:
+        uid: firebase user id
+
+    Returns:
+        user: UserData object (a copy, so that callers can modify it)
+
+    Raises:
+        UserData.DoesNotExist: if the user has not signed up
+    """
+    user = user_cache.get(uid)
+
+    if user is None:
+        user = UserData.objects.get(firebase_id=uid)
+        user_cache.set(uid, user, ttl=user_cache_ttl)
+
+    return copy.copy(user)
+
+
+def invalidate_user(uid):
+    """
+    Removes a user from the cache (called whenever a UserData object changes)
+    """
+    user_cache.delete(uid)
+
+
+async def authenticate_async(request, require_user=True):
+    """
+    Authenticates a request inside an async view. Token verification and user
+    lookup run on the I/O executor, so they do not block the event loop.
+
+    Parameters:
+        request: DRF request
+        require_user: whether the user has to be signed up
+
+    Returns:
+        (user, claims): UserData object (None if require_user is False) and decoded token
+
+    Raises:
+        NotAuthenticated: if no token is provided
+        AuthenticationFailed: if the token is invalid
+        NotFound: if the user has not signed up
+    """
+    claims = await run_io(get_claims, request)
+
+    if claims is None:
+        raise exceptions.NotAuthenticated("Invalid input. Please provide a firebase token.")
+
+    if not require_user:
+        return None, claims
+
+    try:
+        user = await run_io(get_user, claims["uid"])
+
+    except UserData.DoesNotExist:
+        raise exceptions.NotFound("User does not exist. Please sign up.")
+
+    return user, claims
 
 
 class FirebaseAuthentication(authentication.BaseAuthentication):
@@ -20,28 +132,22 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         Authenticates users with firebase tokens
 
         Returns:
-            user: User object if authentication was successful. None otherwise.
+            (user, claims): UserData object and decoded token if authentication was successful.
+                None if no token is provided.
         """
+        claims = get_claims(request)
 
-        # extract token from header
-        token = request.header.get("Authorization")
-
-        # if no token is provided, return None
-        if not token:
+        if claims is None:
             return None
 
         try:
-            decoded_token = auth.verify_id_token(token)
-            uid = decoded_token["uid"]
+            user = get_user(claims["uid"])
 
-        # if the token is invalid, verify_id_token will throw an exception
-        except:
-            return None
+        except UserData.DoesNotExist:
+            raise exceptions.NotFound("User does not exist. Please sign up.")
 
-        # if the token is valid, check if the user already exists in the database (if not, create a new user)
-        try:
-            user = User.objects.get(firebase_id=uid)
-            return user
+        return user, claims
 
-        except:
-            return None
+    def authenticate_header(self, request):
+        # makes DRF answer with 401 instead of 403 if authentication fails
+        return "Bearer"
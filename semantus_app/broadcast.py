@@ -0,0 +1,37 @@
+"""
+Fan-out of game events to the participants of a game that are connected via
+WebSocket (see consumers.py). Events are sent through the channel layer
+configured in CHANNEL_LAYERS: an in-memory layer for single-process deployments
+and tests, or a broker-backed layer (Redis) when several workers serve games.
+"""
+
+from channels.layers import get_channel_layer
+
+
+def group_name(game_id):
+    """
+    Returns:
+        name: name of the channel group of all connections to a game
+    """
+    return f"game_{game_id}"
+
+
+async def publish_async(game_id, event, data):
+    """
+    Sends an event to all participants of a game that are currently connected
+
+    Parameters:
+        game_id: public id of the game (Game.game_id)
+        event: type of the event (e.g. "guess", "best_guess", "join")
+        data: JSON-serializable payload
+    """
+    channel_layer = get_channel_layer()
+
+    # WebSockets are disabled if no channel layer is configured
+    if channel_layer is None:
+        return
+
+    await channel_layer.group_send(
+        group_name(game_id),
+        {"type": "game.event", "event": event, "data": data},
+    )
@@ -0,0 +1,122 @@
+"""
+In-process caches shared by the different subsystems of the app. Every cache
+registers itself under a name so that its hit/miss/eviction counters can be
+inspected at runtime (see StatsView).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_registry = {}
+
+
+class LRUCache:
+    """
+    Thread-safe dictionary with a bounded size. If the cache is full, the least
+    recently used entry is evicted. Entries can optionally expire.
+    """
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        # counters to size the cache
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        _registry[name] = self
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored for key and marks it as recently used.
+
+        Parameters:
+            key: key to look up
+            default: value returned if key is not cached
+
+        Returns:
+            value: cached value or default
+        """
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None, expires_at=None):
+        """
+        Stores value for key and evicts the least recently used entry if the
+        cache is full.
+
+        Parameters:
+            key: key to store value under
+            value: value to cache
+            ttl: number of seconds after which the entry expires
+            expires_at: unix timestamp at which the entry expires
+        """
+        if ttl is not None:
+            expires_at = time.time() + ttl
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+
+        return entry is not None and (entry[1] is None or entry[1] > time.time())
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """
+        Returns:
+            stats: dictionary with size and hit/miss/eviction counters
+        """
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def all_stats():
+    """
+    Returns:
+        stats: dictionary that maps cache names to their counters
+    """
+    return {name: cache.stats() for name, cache in _registry.items()}
@@ -0,0 +1,74 @@
+"""
+Consumers handle WebSocket connections, similar to how views handle HTTP requests.
+Participants of a game connect to its channel and receive new guesses, best
+guess updates and joins as they happen instead of polling GameView.
+"""
+
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .authentication import get_user
+from .broadcast import group_name
+from .models import GameParticipants
+from .tokens import verify_token
+
+
+class GameConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Goal: Push game events to all participants of a game.
+
+    URL: ws/game/<game_id>/?token=<firebase token>
+    (browsers cannot set headers on WebSocket connections, so the token is passed as parameter)
+    """
+
+    async def connect(self):
+        self.game_id = self.scope["url_route"]["kwargs"]["game_id"]
+        self.group = group_name(self.game_id)
+
+        token = parse_qs(self.scope["query_string"].decode()).get("token", [None])[0]
+        self.user = await self._authenticate(token)
+
+        # only participants of the game may listen to it
+        if self.user is None or not await self._is_participant(self.user):
+            await self.close(code=4001)
+            return
+
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+        await self.channel_layer.group_send(
+            self.group,
+            {"type": "game.event", "event": "join", "data": {"username": self.user.username}},
+        )
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # guesses are submitted via GameView, the socket only pushes events
+        pass
+
+    async def game_event(self, message):
+        """
+        Forwards events sent to the group of the game (see broadcast.publish_async)
+        """
+        await self.send_json({"event": message["event"], "data": message["data"]})
+
+    @database_sync_to_async
+    def _authenticate(self, token):
+        if not token:
+            return None
+
+        # invalid tokens and users that have not signed up are rejected
+        try:
+            return get_user(verify_token(token)["uid"])
+        except Exception:
+            return None
+
+    @database_sync_to_async
+    def _is_participant(self, user):
+        return GameParticipants.objects.filter(
+            game_id__game_id=self.game_id, user_id=user
+        ).exists()
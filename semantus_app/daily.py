@@ -0,0 +1,245 @@
+"""
+The daily puzzle is the same for all players. Its target word is picked
+deterministically from the date, and its full ranking (rank and similarity of
+every word of the vocabulary) is precomputed ahead of time (see prepare_daily).
+Requests for the daily puzzle are then answered from memory-mapped files and an
+in-process cache, without touching the database.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from .caches import LRUCache
+from .models import WordData
+from .settings import embedding_dir, daily_salt, daily_hint_ranks
+from .similarity import get_engine, to_score
+
+DAILY_DIR = "daily"
+
+# first daily puzzle, used to number puzzles
+FIRST_DAY = date(2023, 1, 1)
+
+cache = LRUCache("daily", 8)
+_lock = threading.Lock()
+
+
+class DailyPuzzle:
+    """
+    Precomputed ranking of the target word of one day
+    """
+
+    def __init__(self, day, word, ranks, similarities, meta):
+        self.day = day
+        self.word = word
+
+        # rank of every row of the embedding store (0 for the target word itself)
+        self.ranks = ranks
+
+        # similarity of every row of the embedding store to the target word
+        self.similarities = similarities
+
+        self.meta = meta
+
+    @property
+    def etag(self):
+        return f'"{self.day.isoformat()}-{self.meta["version"]}"'
+
+    def metadata(self):
+        """
+        Returns:
+            data: public information about the puzzle (without the target word)
+        """
+        return {
+            "date": self.day.isoformat(),
+            "number": (self.day - FIRST_DAY).days + 1,
+            "nearest": self.meta["nearest"],
+        }
+
+    def lookup(self, word):
+        """
+        Returns:
+            similarity: cosine similarity of word and the target word (None if word is unknown)
+            rank: rank of word (0 for the target word, None if word is unknown)
+        """
+        row = get_engine().store.row(word)
+
+        if row is None:
+            return None, None
+
+        return float(self.similarities[row]), int(self.ranks[row])
+
+
+def pick_word(day):
+    """
+    Picks the target word of a day. The pick only depends on the date and the
+    vocabulary, so every worker picks the same word.
+
+    Parameters:
+        day: date of the puzzle
+
+    Returns:
+        word: target word
+    """
+    candidates = WordData.objects.filter(row__isnull=False).order_by("id")
+    count = candidates.count()
+
+    if count == 0:
+        raise ValueError("WordData is empty.")
+
+    digest = hashlib.sha256(f"{daily_salt}:{day.isoformat()}".encode()).hexdigest()
+    return candidates.values_list("word", flat=True)[int(digest, 16) % count]
+
+
+def _directory(day):
+    return os.path.join(embedding_dir, DAILY_DIR, day.isoformat())
+
+
+def _write(path, write, mode="wb"):
+    """
+    Writes a file through a temporary file of this process and moves it into
+    place, so that workers preparing the same puzzle never write to the same file
+    """
+    encoding = None if "b" in mode else "utf-8"
+
+    with tempfile.NamedTemporaryFile(
+        mode, encoding=encoding, dir=os.path.dirname(path), suffix=".tmp", delete=False
+    ) as file:
+        try:
+            write(file)
+        except BaseException:
+            file.close()
+            os.remove(file.name)
+            raise
+
+    os.replace(file.name, path)
+
+
+def prepare(day):
+    """
+    Picks the target word of a day and precomputes its ranking.
+    The target word is kept if the puzzle has been prepared before (e.g. for an
+    older version of the embedding store).
+
+    Parameters:
+        day: date of the puzzle
+
+    Returns:
+        puzzle: DailyPuzzle
+    """
+    directory = _directory(day)
+    meta_path = os.path.join(directory, "meta.json")
+
+    if os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as file:
+            word = json.load(file)["word"]
+    else:
+        word = pick_word(day)
+
+    engine = get_engine()
+    store = engine.store
+    target_row = store.row(word)
+
+    if target_row is None:
+        raise ValueError(f"Target word {word} is not in the embedding store.")
+
+    similarities = engine.similarities_to_all(
+        np.asarray(engine.vectors[target_row], dtype=np.float32)
+    ).astype(np.float32)
+
+    # the target itself scores exactly 1, also for rows of lower precision
+    similarities[target_row] = 1.0
+
+    # rank 0 is the target word itself, rank 1 its nearest neighbor
+    order = np.argsort(-similarities, kind="stable")
+    ranks = np.empty(len(order), dtype=np.int32)
+    ranks[order] = np.arange(len(order), dtype=np.int32)
+
+    meta = {
+        "word": word,
+        "version": store.version,
+        "nearest": {
+            str(rank): to_score(float(similarities[order[rank]]))
+            for rank in daily_hint_ranks
+            if rank < len(order)
+        },
+    }
+
+    os.makedirs(directory, exist_ok=True)
+
+    for name, array in (("ranks.npy", ranks), ("similarities.npy", similarities)):
+        _write(os.path.join(directory, name), lambda file: np.save(file, array))
+
+    _write(meta_path, lambda file: json.dump(meta, file, ensure_ascii=False), mode="w")
+
+    return DailyPuzzle(day, word, ranks, similarities, meta)
+
+
+def _load(day):
+    directory = _directory(day)
+
+    with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as file:
+        meta = json.load(file)
+
+    # the ranking refers to rows of a specific version of the embedding store
+    if meta["version"] != get_engine().store.version:
+        return None
+
+    return DailyPuzzle(
+        day,
+        meta["word"],
+        np.load(os.path.join(directory, "ranks.npy"), mmap_mode="r"),
+        np.load(os.path.join(directory, "similarities.npy"), mmap_mode="r"),
+        meta,
+    )
+
+
+def get_puzzle(day):
+    """
+    Returns the puzzle of a day from the cache, from disk or, if it has not been
+    prepared ahead of time, computes it (once per worker).
+
+    Parameters:
+        day: date of the puzzle
+
+    Returns:
+        puzzle: DailyPuzzle
+    """
+    key = (day, get_engine().store.version)
+    puzzle = cache.get(key)
+
+    if puzzle is not None:
+        return puzzle
+
+    with _lock:
+        puzzle = cache.get(key)
+
+        if puzzle is None:
+            try:
+                puzzle = _load(day)
+            except FileNotFoundError:
+                puzzle = None
+
+            if puzzle is None:
+                puzzle = prepare(day)
+
+            cache.set(key, puzzle)
+
+    return puzzle
+
+
+def seconds_until(day):
+    """
+    Returns:
+        seconds: seconds from now until the end of day (used for Cache-Control)
+    """
+    now = timezone.localtime()
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+    return max(int((end - now).total_seconds()), 0)
@@ -0,0 +1,331 @@
+"""
+The embedding store keeps the vectors of all words in WordData as one contiguous
+NumPy matrix. The matrix is saved as a .npy file and memory-mapped, so that all
+workers on a machine share the same pages through the page cache. Row i of the
+matrix belongs to the i-th word of the word index (WordData.row).
+
+Every rebuild of the store is written to a new version directory. The CURRENT
+file in the embedding directory names the version that is served; it is replaced
+atomically, and workers pick up the new version without a restart.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .settings import embedding_dir, embedding_dtype, embedding_check_interval
+
+MATRIX_FILE = "vectors.npy"
+WORDS_FILE = "words.json"
+META_FILE = "meta.json"
+SCALES_FILE = "scales.npy"
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+
+
+class QuantizedMatrix:
+    """
+    int8 embedding matrix with one float32 scale per row (row i is approximately
+    codes[i] * scales[i]). Takes a quarter of the memory of a float32 matrix.
+    Indexing returns dequantized float32 rows, so it can be used like a matrix.
+    """
+
+    def __init__(self, codes, scales):
+        self.codes = codes
+        self.scales = scales
+
+    @classmethod
+    def quantize(cls, matrix):
+        """
+        Parameters:
+            matrix: 2D float array
+
+        Returns:
+            quantized: QuantizedMatrix with symmetric per-row scales
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        scales = np.abs(matrix).max(axis=1) / 127
+        scales[scales == 0] = 1
+
+        codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+
+        return cls(codes, scales.astype(np.float32))
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def dtype(self):
+        return self.codes.dtype
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scales.nbytes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, key):
+        scales = np.asarray(self.scales[key], dtype=np.float32)
+        return self.codes[key].astype(np.float32) * np.expand_dims(scales, -1)
+
+    def dot(self, vector, start=0, stop=None):
+        """
+        Scores the rows start:stop against a float32 vector on the codes
+        (the scales are applied to the results instead of the rows)
+        """
+        return (self.codes[start:stop] @ vector) * self.scales[start:stop]
+
+
+class EmbeddingStore:
+    """
+    Read-only view on the embedding matrix and its word index
+    """
+
+    def __init__(self, matrix, words, normalized=False, directory=None):
+        self.matrix = matrix
+        self.words = words
+        self.index = {word: row for row, word in enumerate(words)}
+
+        # whether all rows have unit length
+        self.normalized = normalized
+
+        # data derived from the store (e.g. rank tables) is saved next to it
+        self.directory = directory
+        self.version = os.path.basename(directory) if directory else None
+
+    @classmethod
+    def load(cls, directory=None, mmap=True):
+        """
+        Loads the store from disk
+
+        Parameters:
+            directory: directory that contains the matrix and the word index
+                (defaults to the current version)
+            mmap: whether the matrix is memory-mapped instead of read into memory
+
+        Returns:
+            store: EmbeddingStore
+        """
+        directory = directory or current_directory()
+
+        matrix = np.load(
+            os.path.join(directory, MATRIX_FILE), mmap_mode="r" if mmap else None
+        )
+
+        with open(os.path.join(directory, WORDS_FILE), "r", encoding="utf-8") as file:
+            words = json.load(file)
+
+        meta_path = os.path.join(directory, META_FILE)
+        meta = {}
+
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as file:
+                meta = json.load(file)
+
+        if meta.get("dtype") == "int8":
+            matrix = QuantizedMatrix(matrix, np.load(os.path.join(directory, SCALES_FILE)))
+
+        return cls(
+            matrix,
+            words,
+            normalized=meta.get("normalized", False),
+            directory=str(directory),
+        )
+
+    @property
+    def dimensions(self):
+        return self.matrix.shape[1]
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.index
+
+    def row(self, word):
+        """
+        Returns:
+            row: row of word in the matrix or None if the word is unknown
+        """
+        return self.index.get(word)
+
+    def vector(self, word):
+        """
+        Returns:
+            vector: float32 embedding of word or None if the word is unknown
+        """
+        row = self.index.get(word)
+
+        if row is None:
+            return None
+
+        return np.asarray(self.matrix[row], dtype=np.float32)
+
+
+def normalize_rows(matrix):
+    """
+    Scales all rows of matrix to unit length (rows of zeros are left unchanged)
+
+    Parameters:
+        matrix: 2D array of embeddings
+
+    Returns:
+        normalized: float32 array with rows of unit length
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+
+    return matrix / norms
+
+
+def current_directory():
+    """
+    Returns:
+        directory: directory of the version that is currently served
+    """
+    current_path = os.path.join(embedding_dir, CURRENT_FILE)
+
+    try:
+        with open(current_path, "r", encoding="utf-8") as file:
+            return os.path.join(embedding_dir, VERSIONS_DIR, file.read().strip())
+
+    # stores written before versioning live directly in the embedding directory
+    except FileNotFoundError:
+        return str(embedding_dir)
+
+
+def publish(version):
+    """
+    Atomically switches the served store to another version
+
+    Parameters:
+        version: name of a directory in the versions directory
+    """
+    current_path = os.path.join(embedding_dir, CURRENT_FILE)
+
+    with open(current_path + ".tmp", "w", encoding="utf-8") as file:
+        file.write(version)
+
+    os.replace(current_path + ".tmp", current_path)
+
+
+def prune_versions(keep=3):
+    """
+    Deletes old versions of the store. Workers that still map a deleted version
+    keep reading it until they switch, since the files are only unlinked.
+
+    Parameters:
+        keep: number of most recent versions to keep (the current one is always kept)
+    """
+    versions_dir = os.path.join(embedding_dir, VERSIONS_DIR)
+
+    if not os.path.isdir(versions_dir):
+        return
+
+    current = os.path.basename(current_directory())
+    versions = sorted(os.listdir(versions_dir), reverse=True)
+
+    for version in versions[keep:]:
+        if version != current:
+            shutil.rmtree(os.path.join(versions_dir, version), ignore_errors=True)
+
+
+def write_store(words, matrix, dtype=embedding_dtype, normalize=True, activate=True):
+    """
+    Saves an embedding matrix and its word index as a new version of the store.
+    The version is only published once all files are complete, so readers never
+    see partial files.
+
+    Parameters:
+        words: list of words, words[i] belongs to matrix[i]
+        matrix: 2D array of embeddings
+        dtype: precision of the stored matrix ("float32", "float16" or "int8")
+        normalize: whether rows are scaled to unit length before saving
+        activate: whether the new version is served right away
+
+    Returns:
+        version: name of the new version
+    """
+    if len(words) != len(matrix):
+        raise ValueError("Number of words and number of vectors differ.")
+
+    if normalize:
+        matrix = normalize_rows(matrix)
+
+    # version names sort by creation time
+    version = f"{datetime.now(timezone.utc):%Y%m%d%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+    directory = os.path.join(embedding_dir, VERSIONS_DIR, version)
+    os.makedirs(directory)
+
+    if dtype == "int8":
+        quantized = QuantizedMatrix.quantize(matrix)
+
+        with open(os.path.join(directory, SCALES_FILE), "wb") as file:
+            np.save(file, quantized.scales)
+
+        matrix = quantized.codes
+
+    with open(os.path.join(directory, MATRIX_FILE), "wb") as file:
+        np.save(file, np.ascontiguousarray(matrix, dtype=dtype))
+
+    with open(os.path.join(directory, WORDS_FILE), "w", encoding="utf-8") as file:
+        json.dump(list(words), file, ensure_ascii=False)
+
+    with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as file:
+        json.dump({"dtype": dtype, "normalized": normalize}, file)
+
+    if activate:
+        publish(version)
+
+    return version
+
+
+_store = None
+_checked_at = 0
+_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Returns the embedding store of this process and loads it on first use. At
+    most every embedding_check_interval seconds, the store is reloaded if another
+    version has been published.
+    """
+    global _store, _checked_at
+
+    now = time.monotonic()
+
+    if _store is not None and now - _checked_at < embedding_check_interval:
+        return _store
+
+    with _lock:
+        if _store is None or os.path.normpath(current_directory()) != os.path.normpath(
+            _store.directory
+        ):
+            _store = EmbeddingStore.load()
+
+        _checked_at = now
+
+    return _store
+
+
+def parse_vector(text):
+    """
+    Parses a space-separated vector (legacy format of WordData.vector)
+
+    Parameters:
+        text: string of decimal numbers separated by spaces
+
+    Returns:
+        vector: float32 array
+    """
+    return np.array(text.split(), dtype=np.float32)
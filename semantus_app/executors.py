@@ -0,0 +1,58 @@
+"""
+Bounded executors for async views. Blocking work is offloaded so that it never
+blocks the event loop: network and database I/O (e.g. firebase token verification)
+runs on the I/O executor, similarity computations on the CPU executor. NumPy
+releases the GIL while computing, so threads are sufficient for the CPU work.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+
+from .settings import io_executor_workers, cpu_executor_workers
+
+io_executor = ThreadPoolExecutor(
+    max_workers=io_executor_workers, thread_name_prefix="semantus-io"
+)
+cpu_executor = ThreadPoolExecutor(
+    max_workers=cpu_executor_workers, thread_name_prefix="semantus-cpu"
+)
+
+
+def _with_connections(func, *args, **kwargs):
+    # executor threads outlive requests, so their database connections are
+    # recycled like the connections of request threads (see CONN_MAX_AGE)
+    close_old_connections()
+
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_io(func, *args, **kwargs):
+    """
+    Runs a blocking I/O function on the I/O executor
+
+    Returns:
+        result: return value of func
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        io_executor, functools.partial(_with_connections, func, *args, **kwargs)
+    )
+
+
+async def run_cpu(func, *args, **kwargs):
+    """
+    Runs a CPU-bound function on the CPU executor
+
+    Returns:
+        result: return value of func
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        cpu_executor, functools.partial(_with_connections, func, *args, **kwargs)
+    )
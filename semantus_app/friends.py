@@ -0,0 +1,132 @@
+"""
+Friends of a user. Contact stores each friendship once (user1 sent the request
+to user2), so the contacts of a user are read as a UNION of two queries that are
+each served by an index (contact_user1_idx, contact_user2_idx). The public
+fields of the other user are joined in the same query, so one query returns the
+complete friend list, pending requests and favorites of a user.
+
+Contacts are cached per user and invalidated whenever a Contact of the user
+changes (see signals.py). Changes of usernames or avatars of friends are picked
+up after friends_cache_ttl seconds.
+"""
+
+from django.db.models import F, Value, BooleanField
+
+from .caches import LRUCache
+from .models import Contact
+from .settings import friends_cache_size, friends_cache_ttl
+
+cache = LRUCache("friends", friends_cache_size)
+
+
+def _contacts_query(user_id):
+    """
+    Returns:
+        queryset: one row per contact of the user with the public fields of the other user
+    """
+    fields = ["friend_id", "username", "avatar", "favorite", "is_pending", "outgoing"]
+
+    sent = (
+        Contact.objects.filter(user1=user_id)
+        .annotate(
+            friend_id=F("user2"),
+            username=F("user2__username"),
+            avatar=F("user2__avatar"),
+            favorite=F("favorite1"),
+            is_pending=F("pending"),
+            outgoing=Value(True, output_field=BooleanField()),
+        )
+        .values(*fields)
+    )
+
+    received = (
+        Contact.objects.filter(user2=user_id)
+        .annotate(
+            friend_id=F("user1"),
+            username=F("user1__username"),
+            avatar=F("user1__avatar"),
+            favorite=F("favorite2"),
+            is_pending=F("pending"),
+            outgoing=Value(False, output_field=BooleanField()),
+        )
+        .values(*fields)
+    )
+
+    return sent.union(received, all=True)
+
+
+def get_contacts(user_id):
+    """
+    Returns all contacts of a user (from the cache if possible)
+
+    Parameters:
+        user_id: primary key of the user
+
+    Returns:
+        contacts: list of dictionaries with friend_id, username, avatar, favorite,
+            is_pending and outgoing (whether the user sent the request)
+    """
+    contacts = cache.get(user_id)
+
+    if contacts is None:
+        contacts = sorted(_contacts_query(user_id), key=lambda contact: contact["username"] or "")
+        cache.set(user_id, contacts, ttl=friends_cache_ttl)
+
+    return contacts
+
+
+def invalidate(*user_ids):
+    """
+    Removes the cached contacts of users (called whenever one of their contacts changes)
+    """
+    for user_id in user_ids:
+        cache.delete(user_id)
+
+
+def _public(contact):
+    return {"username": contact["username"], "avatar": contact["avatar"]}
+
+
+def friend_ids(user_id):
+    """
+    Returns:
+        ids: primary keys of all users that have an accepted contact with the user
+    """
+    return {contact["friend_id"] for contact in get_contacts(user_id) if not contact["is_pending"]}
+
+
+def friends(user_id):
+    """
+    Returns:
+        friends: public fields of all friends (accepted contacts) and whether they are favorites
+    """
+    return [
+        dict(_public(contact), favorite=contact["favorite"])
+        for contact in get_contacts(user_id)
+        if not contact["is_pending"]
+    ]
+
+
+def favorites(user_id):
+    """
+    Returns:
+        favorites: public fields of all friends the user has marked as favorite
+    """
+    return [
+        _public(contact)
+        for contact in get_contacts(user_id)
+        if contact["favorite"] and not contact["is_pending"]
+    ]
+
+
+def pending_requests(user_id):
+    """
+    Returns:
+        requests: public fields of all users that sent the user a friend request
+            that has not been answered yet
+    """
+    return [
+        _public(contact)
+        for contact in get_contacts(user_id)
+        if contact["is_pending"] and not contact["outgoing"]
+    ]
@@ -0,0 +1,477 @@
+"""
+In-memory state of active games. Participants, guessed words and best guesses
+of a game are loaded from the database once and then served from memory, so a
+guess does not need to read from the database. Best guess updates are written
+back in batches by a background thread (write-behind).
+
+Guesses themselves are inserted right away: several workers may serve the same
+game, and only the (game_id, guess) constraint decides which of them gets a
+word. A guess is reported as added only once its row has been written, and rows
+written through other workers are picked up by refresh().
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.db import (
+    DatabaseError,
+    IntegrityError,
+    InterfaceError,
+    OperationalError,
+    close_old_connections,
+    transaction,
+)
+
+from .models import Game, GameGuesses, GameParticipants
+from .serializers import fast_game_serializer
+from .settings import (
+    game_state_flush_interval,
+    game_state_flush_size,
+    game_state_idle_timeout,
+    game_state_max_games,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class GameState:
+    """
+    State of a single game
+    """
+
+    def __init__(self, game, participants):
+        self.game = game
+        self.game_id = game.game_id
+        self.target = game.word_id.word
+
+        # public fields of the game (they do not change while it is active)
+        self.data = fast_game_serializer.serialize(game)
+
+        # user primary key => [username, best guess]
+        self.participants = participants
+
+        # list of (username, word, similarity) in the order of guessing
+        self.guesses = []
+
+        # guessed words, including words whose rows are still being inserted
+        self.guessed = set()
+        self._inserting = set()
+
+        # id of the newest row of GameGuesses that has been loaded
+        self._last_id = 0
+
+        self.last_used = time.monotonic()
+
+        # best guesses that still have to be written to the database
+        self._pending_best = {}
+
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, game_id):
+        """
+        Loads the state of a game from the database
+
+        Parameters:
+            game_id: public id of the game (Game.game_id)
+
+        Returns:
+            state: GameState or None if the game does not exist
+        """
+        try:
+            game = Game.objects.select_related("word_id").get(game_id=game_id)
+        except Game.DoesNotExist:
+            return None
+
+        participants = {
+            user_pk: [username, float(best_guess)]
+            for user_pk, username, best_guess in GameParticipants.objects.filter(
+                game_id=game
+            ).values_list("user_id", "user_id__username", "best_guess")
+        }
+
+        state = cls(game, participants)
+        state.refresh()
+
+        return state
+
+    def refresh(self):
+        """
+        Loads the guesses that have been written since the last refresh (e.g.
+        through other workers)
+        """
+        rows = list(
+            GameGuesses.objects.filter(game_id=self.game, id__gt=self._last_id)
+            .order_by("id")
+            .values_list("id", "user_id", "user_id__username", "guess", "similarity")
+        )
+
+        with self._lock:
+            for row_id, user_pk, username, word, similarity in rows:
+                self._last_id = max(self._last_id, row_id)
+
+                # words of this worker are added by the thread that inserts them
+                if word not in self.guessed:
+                    self.guessed.add(word)
+                    self._append(user_pk, username, word, float(similarity))
+
+    def is_participant(self, user):
+        """
+        Checks whether a user takes part in the game. Users that are not known in
+        memory are looked up in the database, since they may have joined through
+        another worker.
+        """
+        self.last_used = time.monotonic()
+
+        if user.pk in self.participants:
+            return True
+
+        participant = (
+            GameParticipants.objects.filter(game_id=self.game, user_id=user)
+            .values_list("best_guess", flat=True)
+            .first()
+        )
+
+        if participant is None:
+            return False
+
+        with self._lock:
+            self.participants.setdefault(user.pk, [user.username, float(participant)])
+
+        return True
+
+    def has_guess(self, word):
+        return word in self.guessed
+
+    def add_guess(self, user, word, similarity):
+        """
+        Adds a guess to the game and writes it to the database
+
+        Parameters:
+            user: UserData object of a participant
+            word: lemmatized word
+            similarity: score of the guess
+
+        Returns:
+            added: False if the word has already been guessed (also through another worker)
+            best: True if the guess is the new best guess of the user
+        """
+        if not self._reserve([word]):
+            return False, False
+
+        try:
+            with transaction.atomic():
+                GameGuesses.objects.create(
+                    game_id=self.game, user_id=user, guess=word, similarity=similarity
+                )
+
+        # the word has been guessed through another worker in the meantime
+        except IntegrityError:
+            self._reject([word])
+            return False, False
+
+        except Exception:
+            self._release([word])
+            raise
+
+        with self._lock:
+            self._inserting.discard(word)
+            best = self._append(user.pk, user.username, word, similarity)
+
+        self.last_used = time.monotonic()
+
+        return True, best
+
+    def add_guesses(self, user, guesses):
+        """
+        Adds several guesses of a user to the game and writes them with a single bulk_create
+
+        Parameters:
+            user: UserData object of a participant
+            guesses: list of (lemmatized word, score)
+
+        Returns:
+            added: list of flags (False if the word has already been guessed) in the order of guesses
+            best: True if one of the guesses is the new best guess of the user
+        """
+        reserved = self._reserve([word for word, _ in guesses])
+        scores = {word: similarity for word, similarity in guesses if word in reserved}
+
+        written = set()
+
+        if scores:
+            try:
+                # words that have already been written (also by this user through
+                # another worker) are duplicates and not inserted again
+                existing = set(
+                    GameGuesses.objects.filter(
+                        game_id=self.game, guess__in=list(scores)
+                    ).values_list("guess", flat=True)
+                )
+                new = [word for word in scores if word not in existing]
+
+                # words guessed through other workers in the meantime are skipped
+                # by the unique constraint
+                GameGuesses.objects.bulk_create(
+                    [
+                        GameGuesses(
+                            game_id=self.game, user_id=user, guess=word, similarity=scores[word]
+                        )
+                        for word in new
+                    ],
+                    ignore_conflicts=True,
+                )
+                written = {
+                    word
+                    for word, user_pk in GameGuesses.objects.filter(
+                        game_id=self.game, guess__in=new
+                    ).values_list("guess", "user_id")
+                    if user_pk == user.pk
+                }
+
+            except Exception:
+                self._release(list(scores))
+                raise
+
+            self._reject([word for word in scores if word not in written])
+
+        best = False
+
+        with self._lock:
+            # in the order of guesses, so that the guess list stays in the order of guessing
+            for word, score in scores.items():
+                if word in written:
+                    self._inserting.discard(word)
+                    best = self._append(user.pk, user.username, word, score) or best
+
+        self.last_used = time.monotonic()
+
+        # a word that occurs several times is only added once
+        added = []
+
+        for word, _ in guesses:
+            added.append(word in written)
+            written.discard(word)
+
+        return added, best
+
+    def _reserve(self, words):
+        """
+        Marks words as guessed while their rows are inserted
+
+        Returns:
+            reserved: words that had not been guessed yet
+        """
+        reserved = set()
+
+        with self._lock:
+            for word in words:
+                if word not in self.guessed:
+                    self.guessed.add(word)
+                    self._inserting.add(word)
+                    reserved.add(word)
+
+        return reserved
+
+    def _release(self, words):
+        """
+        Frees reserved words whose rows could not be inserted
+        """
+        with self._lock:
+            self._inserting.difference_update(words)
+            self.guessed.difference_update(words)
+
+    def _reject(self, words):
+        """
+        Replaces reserved words that have been written through another worker by
+        the guesses of that worker
+        """
+        if not words:
+            return
+
+        rows = list(
+            GameGuesses.objects.filter(game_id=self.game, guess__in=words)
+            .order_by("id")
+            .values_list("user_id", "user_id__username", "guess", "similarity")
+        )
+
+        with self._lock:
+            self._inserting.difference_update(words)
+            self.guessed.difference_update(words)
+
+            for user_pk, username, word, similarity in rows:
+                if word not in self.guessed:
+                    self.guessed.add(word)
+                    self._append(user_pk, username, word, float(similarity))
+
+    def _append(self, user_pk, username, word, similarity):
+        """
+        Adds a written guess to the state (the lock must be held)
+
+        Returns:
+            best: True if the guess is the new best guess of the user
+        """
+        self.guesses.append((username, word, similarity))
+
+        participant = self.participants.setdefault(user_pk, [username, 0.0])
+        best = similarity > participant[1]
+
+        if best:
+            participant[1] = similarity
+            self._pending_best[user_pk] = similarity
+
+        return best
+
+    @property
+    def pending(self):
+        return len(self._inserting) + len(self._pending_best)
+
+    def snapshot(self):
+        """
+        Returns:
+            data: JSON-serializable view of the game
+        """
+        with self._lock:
+            return {
+                **self.data,
+                "guesses": [
+                    {"username": username, "guess": word, "similarity": similarity}
+                    for username, word, similarity in self.guesses
+                ],
+                "best_guesses": {
+                    username: best_guess for username, best_guess in self.participants.values()
+                },
+            }
+
+    def flush(self):
+        """
+        Writes pending best guesses to the database. Updates are kept for the next
+        flush if the database is not available; updates that fail for any other
+        reason are logged and dropped, so that they cannot block the game.
+        """
+        with self._lock:
+            best, self._pending_best = self._pending_best, {}
+
+        updates = list(best.items())
+
+        for i, (user_pk, similarity) in enumerate(updates):
+            try:
+                GameParticipants.objects.filter(
+                    game_id=self.game, user_id=user_pk, best_guess__lt=similarity
+                ).update(best_guess=similarity)
+
+            except (OperationalError, InterfaceError):
+                with self._lock:
+                    for user_pk, similarity in updates[i:]:
+                        self._pending_best[user_pk] = max(
+                            similarity, self._pending_best.get(user_pk, similarity)
+                        )
+
+                raise
+
+            except DatabaseError:
+                logger.exception(
+                    "Dropping best guess of user %s in game %s", user_pk, self.game_id
+                )
+
+
+class GameStateRegistry:
+    """
+    Holds the states of the active games of this worker and flushes them in the background
+    """
+
+    def __init__(self):
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._flush_requested = threading.Event()
+        self._flusher = None
+
+    def get(self, game_id):
+        """
+        Returns the state of a game and loads it from the database if it is not active yet
+
+        Parameters:
+            game_id: public id of the game (Game.game_id)
+
+        Returns:
+            state: GameState or None if the game does not exist
+        """
+        self._start_flusher()
+
+        with self._lock:
+            state = self._states.get(game_id)
+
+            if state is not None:
+                self._states.move_to_end(game_id)
+                return state
+
+        state = GameState.load(game_id)
+
+        if state is None:
+            return None
+
+        with self._lock:
+            # another thread may have loaded the game in the meantime
+            state = self._states.setdefault(game_id, state)
+            self._states.move_to_end(game_id)
+
+        return state
+
+    def request_flush(self, state):
+        """
+        Wakes up the flusher if a game has collected enough pending changes
+        """
+        if state.pending >= game_state_flush_size:
+            self._flush_requested.set()
+
+    def flush_all(self):
+        """
+        Flushes all games and deactivates games that have been idle for too long
+        """
+        with self._lock:
+            states = list(self._states.values())
+
+        for state in states:
+            try:
+                state.flush()
+            except Exception:
+                logger.exception("Could not flush game %s", state.game_id)
+
+        now = time.monotonic()
+
+        with self._lock:
+            for game_id, state in list(self._states.items()):
+                idle = now - state.last_used > game_state_idle_timeout
+                too_many = len(self._states) > game_state_max_games
+
+                if (idle or too_many) and state.pending == 0:
+                    del self._states[game_id]
+
+    def _start_flusher(self):
+        if self._flusher is not None:
+            return
+
+        with self._lock:
+            if self._flusher is not None:
+                return
+
+            self._flusher = threading.Thread(target=self._run, name="game-state-flusher", daemon=True)
+            self._flusher.start()
+
+        # do not lose pending guesses when the worker shuts down
+        atexit.register(self.flush_all)
+
+    def _run(self):
+        while True:
+            self._flush_requested.wait(game_state_flush_interval)
+            self._flush_requested.clear()
+
+            close_old_connections()
+            self.flush_all()
+
+
+game_states = GameStateRegistry()
@@ -0,0 +1,65 @@
+"""
+Hints reveal a word that is closer to the target than the best guess of a user.
+They are picked from the rank table of the target (see ranking.py): starting at
+the requested rank bucket, the engine walks towards the target and skips words
+that have already been guessed. Every skipped rank is a guessed word, so a hint
+costs at most one step per guess and never scans the vocabulary.
+"""
+
+from .ranking import get_rank_table
+from .settings import hint_buckets
+from .similarity import get_engine, to_score
+
+
+def default_bucket(best_rank):
+    """
+    Returns:
+        bucket: the largest rank of hint_buckets that is better than best_rank
+    """
+    return next((bucket for bucket in sorted(hint_buckets, reverse=True) if bucket < best_rank), 1)
+
+
+def get_hint(target, guessed, user_guesses, bucket=None):
+    """
+    Picks a hint for a user
+
+    Parameters:
+        target: target word of the game
+        guessed: set of all words that have been guessed in the game
+        user_guesses: words guessed by the user (to determine their best rank)
+        bucket: rank at which the search starts (defaults to default_bucket)
+
+    Returns:
+        hint: dictionary with word, rank and similarity or None if the user has
+            already found every word that is better than their best guess
+    """
+    engine = get_engine()
+    store = engine.store
+    target_row = store.row(target)
+
+    if target_row is None:
+        return None
+
+    table = get_rank_table(target_row)
+
+    # guesses outside of the rank table count as one rank below the table
+    user_ranks = [table.rank(store.row(word)) for word in user_guesses]
+    best_rank = min((rank for rank in user_ranks if rank is not None), default=len(table) + 1)
+
+    if bucket is None:
+        bucket = default_bucket(best_rank)
+
+    # the hint has to be better than the best guess of the user
+    start = min(bucket, best_rank - 1, len(table))
+
+    for rank in range(start, 0, -1):
+        word = store.words[table.neighbors[rank - 1]]
+
+        if word not in guessed:
+            return {
+                "word": word,
+                "rank": rank,
+                "similarity": to_score(engine.similarity(target, word)),
+            }
+
+    return None
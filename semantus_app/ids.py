@@ -0,0 +1,62 @@
+"""
+Public ids of games. Ids are ULIDs: 48 bits of milliseconds since the epoch
+followed by 80 cryptographically random bits, encoded as 26 characters of
+Crockford's base32. They never need a collision retry, cannot be guessed, and
+sort by creation time, so new games are appended to the end of the unique index
+on Game.game_id instead of landing on random pages of it.
+
+The public id is only used to look a game up once; participants and guesses
+reference the integer primary key of the game.
+"""
+
+import os
+import threading
+import time
+
+ENCODING = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+LENGTH = 26
+
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+_last_timestamp = -1
+_last_random = 0
+_lock = threading.Lock()
+
+
+def encode(value, length=LENGTH):
+    """
+    Returns:
+        text: value in Crockford's base32, left-padded to length characters
+    """
+    characters = []
+
+    for _ in range(length):
+        value, remainder = divmod(value, 32)
+        characters.append(ENCODING[remainder])
+
+    return "".join(reversed(characters))
+
+
+def new_id():
+    """
+    Generates a ULID. Ids generated by this process within the same millisecond
+    increment the random part, so they keep their order.
+
+    Returns:
+        id: 26-character string
+    """
+    global _last_timestamp, _last_random
+
+    with _lock:
+        timestamp = time.time_ns() // 1_000_000
+
+        if timestamp <= _last_timestamp and _last_random < _RANDOM_MAX:
+            timestamp = _last_timestamp
+            random = _last_random + 1
+        else:
+            random = int.from_bytes(os.urandom(_RANDOM_BITS // 8), "big")
+
+        _last_timestamp, _last_random = timestamp, random
+
+    return encode((timestamp << _RANDOM_BITS) | random)
@@ -0,0 +1,278 @@
+"""
+Building blocks of the streaming import of the embeddings file (see setup_words).
+The file is processed in chunks of lines: worker processes parse the vectors of
+a chunk in one vectorized call and lemmatize its words with nlp.pipe, while the
+main process aggregates the vectors of each lemma into a running mean.
+
+Imports can be resumed: the aggregated state is checkpointed together with the
+byte offset of the last processed line.
+
+This module must not depend on Django so that it can be used by worker processes.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from .lemmatizer import get_language_model, lemmatize_many
+
+
+def decode_word(token):
+    """
+    Decodes the word of a line of the embeddings file, which is stored as the
+    representation of a Python bytes object (e.g. b'Stra\\xc3\\x9fe')
+
+    Parameters:
+        token: first component of a line
+
+    Returns:
+        word: decoded word
+    """
+    word = token[2:-1].encode("latin-1").decode("unicode-escape")
+    return word.encode("latin1").decode("utf-8")
+
+
+def parse_lines(lines):
+    """
+    Parses lines of the embeddings file
+
+    Parameters:
+        lines: list of lines (bytes)
+
+    Returns:
+        words: list of decoded words
+        matrix: float32 array with one row per word
+    """
+    words = []
+    tails = []
+
+    for line in lines:
+        line = line.decode("utf-8").rstrip("\n")
+
+        if not line:
+            continue
+
+        token, _, tail = line.partition(" ")
+        words.append(decode_word(token))
+        tails.append(tail)
+
+    if not words:
+        return [], np.empty((0, 0), dtype=np.float32)
+
+    # parse all vectors of the chunk at once
+    values = np.fromstring(" ".join(tails), dtype=np.float32, sep=" ")
+
+    if values.size % len(words) == 0:
+        return words, values.reshape(len(words), -1)
+
+    # fall back to parsing line by line and drop lines with a different dimension
+    vectors = [np.fromstring(tail, dtype=np.float32, sep=" ") for tail in tails]
+    dimensions = np.bincount([len(vector) for vector in vectors]).argmax()
+    valid = [i for i, vector in enumerate(vectors) if len(vector) == dimensions]
+
+    return [words[i] for i in valid], np.vstack([vectors[i] for i in valid])
+
+
+def init_worker():
+    """
+    Loads the language model once per worker process
+    """
+    get_language_model()
+
+
+def process_chunk(lines):
+    """
+    Parses and lemmatizes a chunk of lines (runs in a worker process)
+
+    Parameters:
+        lines: list of lines (bytes)
+
+    Returns:
+        words: list of surface forms
+        lemmas: list of lemmas (None for words without token)
+        matrix: float32 array with one row per word
+    """
+    words, matrix = parse_lines(lines)
+    lemmas = lemmatize_many(words) if words else []
+
+    return words, lemmas, matrix
+
+
+class LemmaAggregator:
+    """
+    Keeps the running mean of all vectors that were lemmatized to the same word.
+    Only one row per lemma is held in memory.
+    """
+
+    def __init__(self):
+        self.index = {}
+        self.words = []
+        self.means = None
+        self.counts = None
+
+    def __len__(self):
+        return len(self.words)
+
+    def _grow(self, size, dimensions):
+        if self.means is None:
+            capacity = max(size, 1024)
+            self.means = np.zeros((capacity, dimensions), dtype=np.float32)
+            self.counts = np.zeros(capacity, dtype=np.int64)
+
+        elif size > len(self.means):
+            old_capacity = len(self.means)
+            capacity = max(size, 2 * old_capacity)
+
+            # np.resize repeats the existing rows, so the new rows are reset
+            self.means = np.resize(self.means, (capacity, dimensions))
+            self.counts = np.resize(self.counts, capacity)
+            self.means[old_capacity:] = 0
+            self.counts[old_capacity:] = 0
+
+    def add(self, lemmas, matrix):
+        """
+        Adds vectors to the running means of their lemmas
+
+        Parameters:
+            lemmas: list of lemmas (entries that are None are skipped)
+            matrix: float32 array with one row per lemma
+        """
+        rows = []
+        keep = []
+
+        for i, lemma in enumerate(lemmas):
+            if lemma is None:
+                continue
+
+            row = self.index.get(lemma)
+
+            if row is None:
+                row = len(self.words)
+                self.index[lemma] = row
+                self.words.append(lemma)
+
+            rows.append(row)
+            keep.append(i)
+
+        if not rows:
+            return
+
+        self._grow(len(self.words), matrix.shape[1])
+
+        rows = np.asarray(rows)
+        vectors = matrix[keep]
+
+        # sum and count the vectors of each lemma in this chunk
+        unique_rows, inverse, chunk_counts = np.unique(
+            rows, return_inverse=True, return_counts=True
+        )
+        chunk_sums = np.zeros((len(unique_rows), matrix.shape[1]), dtype=np.float64)
+        np.add.at(chunk_sums, inverse, vectors)
+
+        # mean_new = mean + (sum - count * mean) / (n + count)
+        means = self.means[unique_rows]
+        counts = self.counts[unique_rows] + chunk_counts
+        self.means[unique_rows] = means + (
+            chunk_sums - chunk_counts[:, None] * means
+        ) / counts[:, None]
+        self.counts[unique_rows] = counts
+
+    def state(self):
+        """
+        Returns:
+            state: dictionary of arrays that describes the aggregator (see from_state)
+        """
+        words, means = self.result()
+
+        return {
+            "words": np.array(words, dtype=str),
+            "means": means,
+            "counts": self.counts[: len(words)] if self.counts is not None else np.empty(0),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        aggregator = cls()
+        aggregator.words = [str(word) for word in state["words"]]
+        aggregator.index = {word: row for row, word in enumerate(aggregator.words)}
+
+        if aggregator.words:
+            aggregator.means = np.array(state["means"], dtype=np.float32)
+            aggregator.counts = np.array(state["counts"], dtype=np.int64)
+
+        return aggregator
+
+    def result(self):
+        """
+        Returns:
+            words: list of lemmas
+            means: float32 array with the mean vector of each lemma
+        """
+        if self.means is None:
+            return [], np.empty((0, 0), dtype=np.float32)
+
+        return self.words, self.means[: len(self.words)]
+
+
+def content_hash(vector):
+    """
+    Returns:
+        hash: hex digest that changes whenever the float32 representation of vector changes
+    """
+    return hashlib.sha1(np.asarray(vector, dtype=np.float32).tobytes()).hexdigest()
+
+
+class Checkpoint:
+    """
+    Saves and restores the progress of an import. A checkpoint only applies to
+    the exact source file it was written for.
+    """
+
+    def __init__(self, path, source):
+        self.path = path
+
+        stat = os.stat(source)
+        self.source = np.array([os.path.realpath(source), str(stat.st_size), str(stat.st_mtime_ns)])
+
+    def save(self, offset, aggregator, surface_forms):
+        """
+        Parameters:
+            offset: byte offset in the source file up to which all lines are aggregated
+            aggregator: LemmaAggregator
+            surface_forms: dictionary of surface forms and their lemmas
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        with open(self.path + ".tmp", "wb") as file:
+            np.savez(
+                file,
+                source=self.source,
+                offset=np.array(offset),
+                surfaces=np.array(list(surface_forms.keys()), dtype=str),
+                lemmas=np.array(list(surface_forms.values()), dtype=str),
+                **aggregator.state(),
+            )
+
+        os.replace(self.path + ".tmp", self.path)
+
+    def load(self):
+        """
+        Returns:
+            offset: byte offset to resume from (0 if there is no matching checkpoint)
+            aggregator: restored LemmaAggregator
+            surface_forms: restored dictionary of surface forms and their lemmas
+        """
+        if not os.path.exists(self.path):
+            return 0, LemmaAggregator(), {}
+
+        with np.load(self.path) as state:
+            if not np.array_equal(state["source"], self.source):
+                return 0, LemmaAggregator(), {}
+
+            surface_forms = dict(zip(state["surfaces"].tolist(), state["lemmas"].tolist()))
+            return int(state["offset"]), LemmaAggregator.from_state(state), surface_forms
+
+    def delete(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,353 @@
+"""
+Global leaderboard of all users ordered by points (ties are broken by the
+order of signup). Instead of sorting UserData on every request, the ranking is
+kept sorted and updated incrementally whenever the points of a user change
+(see signals.py), so top-N, rank-of-user and friends leaderboards are answered
+without touching the user table.
+
+Two backends implement the same interface:
+
+    LocalLeaderboard: a sorted list in the memory of this worker (bisect)
+    RedisLeaderboard: a sorted set shared by all workers, used if
+        leaderboard_redis_url is set
+
+The local backend only sees point changes made by its own worker and is
+therefore reloaded from the database every leaderboard_refresh_interval seconds,
+in a background thread so that requests keep being served from the old ranking.
+The Redis backend is updated by every worker and never reloaded by them; it is
+filled once with the load_leaderboard command.
+"""
+
+import bisect
+import logging
+import threading
+import time
+
+from django.db import connections
+
+from . import friends as friends_service
+from .models import UserData
+from .settings import leaderboard_redis_url, leaderboard_refresh_interval
+
+logger = logging.getLogger(__name__)
+
+
+def _key(user_id, points):
+    # sort by points (descending), then by signup (ascending)
+    return -points, user_id
+
+
+def _entry(rank, points, username, avatar):
+    return {"rank": rank, "username": username, "avatar": avatar, "points": points}
+
+
+class LocalLeaderboard:
+    """
+    Leaderboard kept as a sorted list of (-points, user id) in the memory of this worker
+    """
+
+    def __init__(self):
+        self._keys = []
+
+        # user id => (points, username, avatar)
+        self._users = {}
+
+        self._lock = threading.Lock()
+
+    def replace(self, rows):
+        """
+        Replaces the whole ranking
+
+        Parameters:
+            rows: iterable of (user id, points, username, avatar)
+        """
+        users = {user_id: (points, username, avatar) for user_id, points, username, avatar in rows}
+        keys = sorted(_key(user_id, points) for user_id, (points, _, _) in users.items())
+
+        with self._lock:
+            self._users = users
+            self._keys = keys
+
+    def update(self, user_id, points, username, avatar):
+        """
+        Inserts a user or moves them to their new position (O(log n) search, O(n) move)
+        """
+        with self._lock:
+            previous = self._users.get(user_id)
+
+            if previous is not None:
+                index = bisect.bisect_left(self._keys, _key(user_id, previous[0]))
+                del self._keys[index]
+
+            bisect.insort(self._keys, _key(user_id, points))
+            self._users[user_id] = (points, username, avatar)
+
+    def remove(self, user_id):
+        with self._lock:
+            previous = self._users.pop(user_id, None)
+
+            if previous is not None:
+                index = bisect.bisect_left(self._keys, _key(user_id, previous[0]))
+                del self._keys[index]
+
+    def top(self, n):
+        """
+        Returns:
+            entries: the n best users
+        """
+        if n <= 0:
+            return []
+
+        with self._lock:
+            return [
+                _entry(rank, *self._users[user_id])
+                for rank, (_, user_id) in enumerate(self._keys[:n], start=1)
+            ]
+
+    def rank(self, user_id):
+        """
+        Returns:
+            entry: position of a user in the global ranking or None if the user is unknown
+        """
+        return next(iter(self.entries([user_id])), None)
+
+    def entries(self, user_ids):
+        """
+        Returns:
+            entries: positions of several users in the global ranking, ordered by rank
+        """
+        with self._lock:
+            entries = [
+                _entry(
+                    bisect.bisect_left(self._keys, _key(user_id, self._users[user_id][0])) + 1,
+                    *self._users[user_id],
+                )
+                for user_id in set(user_ids)
+                if user_id in self._users
+            ]
+
+        return sorted(entries, key=lambda entry: entry["rank"])
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class RedisLeaderboard:
+    """
+    Leaderboard kept in a Redis sorted set, so that all workers share one ranking
+    """
+
+    RANKING = "semantus:leaderboard"
+    PROFILES = "semantus:leaderboard:profiles"
+
+    # scores combine points and user id, so that ties are ordered like in LocalLeaderboard
+    ID_RANGE = 2**32
+
+    def __init__(self, url):
+        import redis
+
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    def _score(self, user_id, points):
+        return points * self.ID_RANGE + (self.ID_RANGE - 1 - user_id)
+
+    def _entries(self, ranked_ids):
+        """
+        Parameters:
+            ranked_ids: list of (0-based rank, user id)
+        """
+        if not ranked_ids:
+            return []
+
+        profiles = self._redis.hmget(self.PROFILES, [str(user_id) for _, user_id in ranked_ids])
+        entries = []
+
+        for (rank, _), profile in zip(ranked_ids, profiles):
+            if profile is None:
+                continue
+
+            points, username, avatar = profile.split("\t")
+            entries.append(_entry(rank + 1, int(points), username, avatar))
+
+        return entries
+
+    def replace(self, rows):
+        pipeline = self._redis.pipeline()
+        pipeline.delete(self.RANKING, self.PROFILES)
+
+        for user_id, points, username, avatar in rows:
+            pipeline.zadd(self.RANKING, {str(user_id): self._score(user_id, points)})
+            pipeline.hset(self.PROFILES, str(user_id), f"{points}\t{username}\t{avatar}")
+
+        pipeline.execute()
+
+    def update(self, user_id, points, username, avatar):
+        pipeline = self._redis.pipeline()
+        pipeline.zadd(self.RANKING, {str(user_id): self._score(user_id, points)})
+        pipeline.hset(self.PROFILES, str(user_id), f"{points}\t{username}\t{avatar}")
+        pipeline.execute()
+
+    def remove(self, user_id):
+        pipeline = self._redis.pipeline()
+        pipeline.zrem(self.RANKING, str(user_id))
+        pipeline.hdel(self.PROFILES, str(user_id))
+        pipeline.execute()
+
+    def top(self, n):
+        if n <= 0:
+            return []
+
+        user_ids = self._redis.zrevrange(self.RANKING, 0, n - 1)
+        return self._entries([(rank, int(user_id)) for rank, user_id in enumerate(user_ids)])
+
+    def rank(self, user_id):
+        return next(iter(self.entries([user_id])), None)
+
+    def entries(self, user_ids):
+        user_ids = list(set(user_ids))
+
+        pipeline = self._redis.pipeline()
+        for user_id in user_ids:
+            pipeline.zrevrank(self.RANKING, str(user_id))
+
+        ranked_ids = sorted(
+            (rank, user_id)
+            for user_id, rank in zip(user_ids, pipeline.execute())
+            if rank is not None
+        )
+
+        return self._entries(ranked_ids)
+
+    def __len__(self):
+        return self._redis.zcard(self.RANKING)
+
+
+_leaderboard = None
+_loaded_at = None
+_reloading = False
+_lock = threading.Lock()
+
+
+def _create():
+    if leaderboard_redis_url:
+        try:
+            return RedisLeaderboard(leaderboard_redis_url)
+        except ImportError:
+            logger.warning("redis is not installed, falling back to the local leaderboard")
+
+    return LocalLeaderboard()
+
+
+def load(leaderboard):
+    """
+    Loads the ranking of all users from the database (served by userdata_points_idx)
+    """
+    leaderboard.replace(
+        UserData.objects.filter(username__isnull=False)
+        .order_by("-points", "id")
+        .values_list("id", "points", "username", "avatar")
+        .iterator()
+    )
+
+
+def _get():
+    global _leaderboard
+
+    if _leaderboard is None:
+        with _lock:
+            if _leaderboard is None:
+                _leaderboard = _create()
+
+    return _leaderboard
+
+
+def _reload(leaderboard):
+    global _loaded_at, _reloading
+
+    try:
+        load(leaderboard)
+        _loaded_at = time.monotonic()
+    except Exception:
+        logger.exception("Could not reload the leaderboard")
+    finally:
+        _reloading = False
+        connections.close_all()
+
+
+def get_leaderboard():
+    """
+    Returns the leaderboard. The local backend is loaded on first use and
+    reloaded in the background once it is stale.
+    """
+    global _loaded_at, _reloading
+
+    leaderboard = _get()
+
+    if not isinstance(leaderboard, LocalLeaderboard):
+        return leaderboard
+
+    if _loaded_at is None:
+        with _lock:
+            if _loaded_at is None:
+                load(leaderboard)
+                _loaded_at = time.monotonic()
+
+    elif time.monotonic() - _loaded_at >= leaderboard_refresh_interval and not _reloading:
+        with _lock:
+            if not _reloading:
+                _reloading = True
+                threading.Thread(
+                    target=_reload, args=(leaderboard,), name="leaderboard-reload", daemon=True
+                ).start()
+
+    return leaderboard
+
+
+def _active():
+    """
+    Returns:
+        leaderboard: the backend that has to follow point changes, or None if the
+            local backend has not been loaded yet (it will read them from the database)
+    """
+    if leaderboard_redis_url:
+        return _get()
+
+    return _leaderboard if _loaded_at is not None else None
+
+
+def update_user(user):
+    """
+    Moves a user to their current position (called whenever a UserData object is saved)
+    """
+    leaderboard = _active()
+
+    if leaderboard is None:
+        return
+
+    if user.username is None:
+        leaderboard.remove(user.pk)
+    else:
+        leaderboard.update(user.pk, user.points, user.username, user.avatar)
+
+
+def remove_user(user_id):
+    leaderboard = _active()
+
+    if leaderboard is not None:
+        leaderboard.remove(user_id)
+
+
+def top(n):
+    return get_leaderboard().top(n)
+
+
+def rank(user_id):
+    return get_leaderboard().rank(user_id)
+
+
+def friends(user_id):
+    """
+    Returns:
+        entries: leaderboard of a user and their friends with global ranks
+    """
+    return get_leaderboard().entries(friends_service.friend_ids(user_id) | {user_id})
@@ -0,0 +1,190 @@
+"""
+Lemma cache in front of the lemmatizer. Lookups are resolved in three tiers:
+
+    1. an in-process LRU cache keyed on the normalized surface form
+    2. the LemmaLookup table, which is shared by all workers and precomputed
+       from the vocabulary (see setup_words and build_lemma_table)
+    3. the spaCy pipeline, whose results are cached in memory and, if the lemma
+       is a word of the embedding store, written back to the lookup table
+
+Lemmas outside the vocabulary are only kept in memory, so arbitrary user input
+does not grow the lookup table.
+"""
+
+import unicodedata
+
+from .caches import LRUCache
+from .embeddings import get_store
+from .executors import run_cpu, run_io
+from .lemmatizer import lemmatize_many
+from .models import LemmaLookup
+from .settings import lemma_cache_size
+
+# marks surface forms that contain no token (so that they are cached as well)
+_NO_LEMMA = ""
+
+cache = LRUCache("lemmas", lemma_cache_size)
+
+
+def normalize(word):
+    """
+    Normalizes the surface form of a word so that equivalent inputs share a cache entry
+
+    Parameters:
+        word: word as entered by the user
+
+    Returns:
+        surface: stripped and NFC-normalized word
+    """
+    return unicodedata.normalize("NFC", word.strip())
+
+
+def get_lemma(word):
+    """
+    Returns the lemma of a single word (see get_lemmas)
+    """
+    return get_lemmas([word])[0]
+
+
+def get_cached_lemma(word):
+    """
+    Returns the lemma of a word without running spaCy or writing to the database
+    (for endpoints that do not require authentication). Words that are not cached
+    are resolved with the word index of the embedding store and a read-only query
+    of the lookup table, so the result does not depend on the cache of the worker.
+
+    Parameters:
+        word: word as entered by the user
+
+    Returns:
+        lemma: lemma of word or None if it cannot be resolved without spaCy
+    """
+    surface = normalize(word)
+    lemma = cache.get(surface)
+
+    if lemma is not None:
+        return lemma or None
+
+    store = get_store()
+
+    if surface in store:
+        return surface
+
+    lemma = LemmaLookup.objects.filter(surface=surface).values_list("lemma", flat=True).first()
+
+    if lemma is not None:
+        cache.set(surface, lemma)
+        return lemma
+
+    # nouns are capitalized in German, but often typed in lower case
+    capitalized = surface[:1].upper() + surface[1:]
+
+    return capitalized if capitalized in store else None
+
+
+def get_lemmas(words):
+    """
+    Returns the lemmas of words, touching the database and spaCy only for
+    surface forms that are not cached yet.
+
+    Parameters:
+        words: list of words to lemmatize
+
+    Returns:
+        lemmas: list of lemmas (None for words without token) in the order of words
+    """
+    surfaces = [normalize(word) for word in words]
+    lemmas, missing = _from_cache(surfaces)
+
+    if missing:
+        _from_table(lemmas, missing)
+
+    if missing:
+        _share(_from_spacy(lemmas, missing))
+
+    return [lemmas[surface] or None for surface in surfaces]
+
+
+async def get_lemmas_async(words):
+    """
+    Async version of get_lemmas for async views: database lookups and writes
+    run on the I/O executor and spaCy on the CPU executor
+    """
+    surfaces = [normalize(word) for word in words]
+    lemmas, missing = _from_cache(surfaces)
+
+    if missing:
+        await run_io(_from_table, lemmas, missing)
+
+    if missing:
+        new_entries = await run_cpu(_from_spacy, lemmas, missing)
+
+        if new_entries:
+            await run_io(_share, new_entries)
+
+    return [lemmas[surface] or None for surface in surfaces]
+
+
+def _from_cache(surfaces):
+    """
+    First tier: in-process cache
+
+    Returns:
+        lemmas: dictionary that maps cached surface forms to their lemma
+        missing: set of surface forms that are not cached
+    """
+    lemmas = {}
+    missing = set()
+
+    for surface in surfaces:
+        lemma = cache.get(surface)
+
+        if lemma is None:
+            missing.add(surface)
+        else:
+            lemmas[surface] = lemma
+
+    return lemmas, missing
+
+
+def _from_table(lemmas, missing):
+    """
+    Second tier: persistent lookup table (resolved forms are removed from missing)
+    """
+    for surface, lemma in LemmaLookup.objects.filter(surface__in=missing).values_list(
+        "surface", "lemma"
+    ):
+        lemmas[surface] = lemma
+        cache.set(surface, lemma)
+        missing.discard(surface)
+
+
+def _from_spacy(lemmas, missing):
+    """
+    Third tier: spaCy
+
+    Returns:
+        new_entries: LemmaLookup objects of the results that are shared with other workers
+    """
+    missing = list(missing)
+    store = get_store()
+    new_entries = []
+
+    for surface, lemma in zip(missing, lemmatize_many(missing)):
+        lemma = lemma or _NO_LEMMA
+        lemmas[surface] = lemma
+        cache.set(surface, lemma)
+
+        # only mappings to words of the vocabulary are shared (like build_lemma_table)
+        if lemma in store and len(surface) <= 100:
+            new_entries.append(LemmaLookup(surface=surface, lemma=lemma))
+
+    return new_entries
+
+
+def _share(new_entries):
+    """
+    Writes spaCy results to the lookup table so that other workers can use them
+    """
+    if new_entries:
+        LemmaLookup.objects.bulk_create(new_entries, ignore_conflicts=True)
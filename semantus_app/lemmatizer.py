@@ -0,0 +1,82 @@
+"""
+The lemmatizer maps German words to their base form. Loading the spaCy pipeline
+is expensive, so it is loaded once per process and shared by all views and
+management commands. Only the components required for lemmatization are loaded.
+"""
+
+import threading
+
+import spacy
+
+from .settings import language_model, disabled_components
+
+_nlp = None
+
+# guards loading the pipeline as well as calls into it (spaCy pipelines are not thread-safe)
+_lock = threading.RLock()
+
+
+def get_language_model():
+    """
+    Returns the shared spaCy pipeline and loads it on first use.
+
+    Returns:
+        nlp: spaCy pipeline without parser and named entity recognition
+    """
+    global _nlp
+
+    if _nlp is None:
+        with _lock:
+            if _nlp is None:
+                _nlp = spacy.load(language_model, disable=disabled_components)
+
+    return _nlp
+
+
+def lemmatize(word):
+    """
+    Lemmatizes a word in German (i.e. returns the base form of the word)
+
+    Parameters:
+        word: word to lemmatize
+
+    Returns:
+        lemma: base form of the word or None if the word contains no token
+    """
+    nlp = get_language_model()
+
+    with _lock:
+        doc = nlp(word)
+
+    if len(doc) == 0:
+        return None
+
+    return doc[0].lemma_
+
+
+def lemmatize_many(words, batch_size=1000, n_process=1):
+    """
+    Lemmatizes many words at once using nlp.pipe, which is considerably faster
+    than calling lemmatize for each word.
+
+    Parameters:
+        words: iterable of words to lemmatize
+        batch_size: number of words that are processed together
+        n_process: number of processes used by spaCy
+
+    Returns:
+        lemmas: list of lemmas (None for words without token) in the order of words
+    """
+    nlp = get_language_model()
+
+    with _lock:
+        docs = nlp.pipe(words, batch_size=batch_size, n_process=n_process)
+        return [doc[0].lemma_ if len(doc) > 0 else None for doc in docs]
+
+
+def warm_up():
+    """
+    Loads the pipeline and runs it once so that the first request does not pay
+    for loading the model.
+    """
+    lemmatize("Wort")
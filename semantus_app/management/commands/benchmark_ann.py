@@ -0,0 +1,68 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from semantus_app.ann import get_index
+from semantus_app.ranking import compute_neighbors
+from semantus_app.similarity import get_engine
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the approximate nearest-neighbor index with exact search: recall of the "
+        "k nearest neighbors and latency per query for different values of nprobe."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", type=int, default=100)
+        parser.add_argument("-k", type=int, default=1000)
+        parser.add_argument(
+            "--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64, 128]
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **kwargs):
+        index = get_index()
+
+        if index is None:
+            raise CommandError("No index has been built for the current store. Run build_ann_index.")
+
+        engine = get_engine()
+        vectors = engine.vectors
+        k = kwargs["k"]
+
+        rng = np.random.default_rng(kwargs["seed"])
+        rows = rng.choice(len(vectors), min(kwargs["queries"], len(vectors)), replace=False)
+
+        # exact neighbors (brute force over the whole store)
+        exact = {}
+        start = time.perf_counter()
+
+        for row in rows:
+            exact[row] = set(compute_neighbors(int(row), k, engine, approximate=False).tolist())
+
+        exact_latency = (time.perf_counter() - start) / len(rows)
+
+        self.stdout.write(f"Index: {index.lists} lists, {len(vectors)} words, k = {k}")
+        self.stdout.write(f"exact search: {1000 * exact_latency:.2f} ms/query")
+
+        for nprobe in kwargs["nprobe"]:
+            recalls = []
+            latencies = []
+
+            for row in rows:
+                query = np.asarray(vectors[row], dtype=np.float32)
+
+                start = time.perf_counter()
+                found, _ = index.search(vectors, query, k, nprobe, exclude=int(row))
+                latencies.append(time.perf_counter() - start)
+
+                recalls.append(len(exact[row].intersection(found.tolist())) / len(exact[row]))
+
+            self.stdout.write(
+                f"nprobe {nprobe:4d}: recall@{k} {np.mean(recalls):.3f}, "
+                f"{1000 * np.mean(latencies):.2f} ms/query "
+                f"(p99 {1000 * np.percentile(latencies, 99):.2f} ms), "
+                f"speedup {exact_latency / np.mean(latencies):.1f}x"
+            )
@@ -0,0 +1,122 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from semantus_app.models import Game, GameGuesses, GameParticipants, UserData, WordData
+from semantus_app.settings import sqlite_pragmas
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures guess-write throughput of the configured database. Run it once per "
+        "database mode (SEMANTUS_DB, SEMANTUS_DB_POOLER, SQLite journal mode) to compare them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--guesses", type=int, default=500, help="Guesses per thread.")
+        parser.add_argument(
+            "--journal-mode",
+            choices=["wal", "delete"],
+            help="Override the SQLite journal mode for this run.",
+        )
+
+    def handle(self, *args, **kwargs):
+        threads = kwargs["threads"]
+        guesses = kwargs["guesses"]
+
+        if kwargs["journal_mode"] and connection.vendor == "sqlite":
+            # configure_sqlite (signals.py) applies sqlite_pragmas to every new
+            # connection, including the ones opened by the worker threads
+            sqlite_pragmas["journal_mode"] = kwargs["journal_mode"]
+
+            with connection.cursor() as cursor:
+                cursor.execute(f"PRAGMA journal_mode = {kwargs['journal_mode']};")
+
+        mode = self._describe_mode()
+
+        # set up a game with one participant per thread
+        word = WordData.objects.create(word="__benchmark__")
+        users = [
+            UserData.objects.create(firebase_id=f"__benchmark_{i}", username=f"__benchmark_{i}")
+            for i in range(threads)
+        ]
+        game = Game.objects.create(game_id="__benchmark__", creator_id=users[0], word_id=word)
+        GameParticipants.objects.bulk_create(
+            [GameParticipants(game_id=game, user_id=user, best_guess=0) for user in users]
+        )
+
+        latencies = [[] for _ in range(threads)]
+        errors = [0] * threads
+
+        def write_guesses(i):
+            try:
+                for j in range(guesses):
+                    start = time.perf_counter()
+
+                    try:
+                        GameGuesses.objects.create(
+                            game_id=game, user_id=users[i], guess=f"b{i}-{j}", similarity=0
+                        )
+                    except Exception:
+                        errors[i] += 1
+
+                    latencies[i].append(time.perf_counter() - start)
+            finally:
+                connections.close_all()
+
+        try:
+            workers = [threading.Thread(target=write_guesses, args=(i,)) for i in range(threads)]
+            start = time.perf_counter()
+
+            for worker in workers:
+                worker.start()
+
+            for worker in workers:
+                worker.join()
+
+            elapsed = time.perf_counter() - start
+
+        # remove all benchmark data (guesses and participants are deleted by cascade)
+        finally:
+            game.delete()
+            word.delete()
+            UserData.objects.filter(firebase_id__startswith="__benchmark_").delete()
+
+        all_latencies = sorted(latency for thread in latencies for latency in thread)
+        written = len(all_latencies) - sum(errors)
+
+        self.stdout.write(f"Mode: {mode}")
+        self.stdout.write(f"Threads: {threads}, guesses per thread: {guesses}")
+        self.stdout.write(
+            f"Throughput: {written / elapsed:.0f} guesses/s ({sum(errors)} failed writes)"
+        )
+        self.stdout.write(
+            "Latency: p50 {:.2f} ms, p99 {:.2f} ms".format(
+                1000 * all_latencies[len(all_latencies) // 2],
+                1000 * all_latencies[int(len(all_latencies) * 0.99)],
+            )
+        )
+
+    def _describe_mode(self):
+        """
+        Returns:
+            mode: human-readable description of the database configuration
+        """
+        database = settings.DATABASES["default"]
+
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode;")
+                journal_mode = cursor.fetchone()[0]
+
+            return f"sqlite (journal_mode={journal_mode})"
+
+        return "{} (CONN_MAX_AGE={}, pooler={})".format(
+            connection.vendor,
+            database.get("CONN_MAX_AGE"),
+            database.get("DISABLE_SERVER_SIDE_CURSORS", False),
+        )
@@ -0,0 +1,94 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from semantus_app.embeddings import QuantizedMatrix, normalize_rows
+from semantus_app.similarity import get_engine
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the accuracy, memory and latency of int8 embeddings (see QuantizedMatrix) "
+        "against float32 embeddings of the current store."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--targets", type=int, default=100)
+        parser.add_argument("-k", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **kwargs):
+        engine = get_engine()
+        k = kwargs["k"]
+
+        # the rows of an int8 store are already quantized and cannot serve as the reference
+        if isinstance(engine.vectors, QuantizedMatrix):
+            raise CommandError(
+                "The current embedding store is int8. Run this command on a float32 or float16 "
+                "store (see convert_vectors --dtype)."
+            )
+
+        # the reference is float32 even if the store is served in float16
+        exact = normalize_rows(engine.vectors[:])
+        quantized = QuantizedMatrix.quantize(exact)
+
+        rng = np.random.default_rng(kwargs["seed"])
+        targets = rng.choice(len(exact), min(kwargs["targets"], len(exact)), replace=False)
+
+        overlaps = []
+        displacements = []
+        top1 = 0
+        exact_latencies = []
+        quantized_latencies = []
+
+        for target in targets:
+            query = exact[target]
+
+            start = time.perf_counter()
+            exact_scores = exact @ query
+            exact_latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            quantized_scores = quantized.dot(query)
+            quantized_latencies.append(time.perf_counter() - start)
+
+            exact_top = self._top(exact_scores, target, k)
+            quantized_top = self._top(quantized_scores, target, k)
+
+            overlaps.append(len(np.intersect1d(exact_top, quantized_top)) / len(exact_top))
+            top1 += exact_top[0] == quantized_top[0]
+
+            # how far the words of the float32 top-k move in the int8 ranking
+            quantized_ranks = {int(row): rank for rank, row in enumerate(quantized_top)}
+            displacements.append(
+                np.mean(
+                    [
+                        abs(rank - quantized_ranks.get(int(row), len(quantized_top)))
+                        for rank, row in enumerate(exact_top)
+                    ]
+                )
+            )
+
+        self.stdout.write(f"Words: {len(exact)}, dimensions: {exact.shape[1]}, targets: {len(targets)}")
+        self.stdout.write(
+            f"Memory: float32 {exact.nbytes / 2**20:.1f} MiB, "
+            f"int8 {quantized.nbytes / 2**20:.1f} MiB ({exact.nbytes / quantized.nbytes:.1f}x smaller)"
+        )
+        self.stdout.write(
+            f"Latency (score all words): float32 {1000 * np.median(exact_latencies):.2f} ms, "
+            f"int8 {1000 * np.median(quantized_latencies):.2f} ms"
+        )
+        self.stdout.write(
+            f"Rank agreement: top-{k} overlap {np.mean(overlaps):.4f}, "
+            f"top-1 agreement {top1 / len(targets):.3f}, "
+            f"mean rank displacement {np.mean(displacements):.2f}"
+        )
+
+    def _top(self, scores, target, k):
+        scores = scores.copy()
+        scores[target] = -np.inf
+        k = min(k, len(scores) - 1)
+
+        best = np.argpartition(-scores, k - 1)[:k]
+        return best[np.argsort(-scores[best], kind="stable")]
@@ -0,0 +1,105 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from semantus_app.models import GameGuesses, UserData
+from semantus_app.renderers import FastJSONRenderer, orjson
+from semantus_app.serializers import FastSerializer, UserDataSerializer, fast_user_serializer
+
+
+class GuessSerializer(serializers.ModelSerializer):
+    """
+    Stock DRF serializer with the output of fast_guess_serializer
+    """
+
+    username = serializers.CharField(source="user_id.username")
+    similarity = serializers.FloatField()
+
+    class Meta:
+        model = GameGuesses
+        fields = ["username", "guess", "similarity"]
+
+
+fast_guess_serializer = FastSerializer(
+    ["username", "guess", "similarity"],
+    sources=["user_id__username", "guess", "similarity"],
+    converters={"similarity": float},
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the per-object cost of the fast serialization path (serializers.FastSerializer "
+        "and renderers.FastJSONRenderer) with stock DRF serializers and JSONRenderer. "
+        "Objects are built in memory, so no database is needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--objects", type=int, default=500, help="Objects per response.")
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **kwargs):
+        n = kwargs["objects"]
+        repeat = kwargs["repeat"]
+
+        users = [
+            UserData(
+                id=i, firebase_id=f"uid{i}", username=f"user_{i}", avatar="default", points=2000 + i
+            )
+            for i in range(n)
+        ]
+        guesses = [
+            GameGuesses(id=i, user_id=users[i % n], guess=f"Wort{i}", similarity=Decimal("42.17"))
+            for i in range(n)
+        ]
+
+        self.stdout.write(
+            f"{n} objects per response, {repeat} repetitions, "
+            f"JSON backend: {'orjson' if orjson is not None else 'json'}"
+        )
+
+        for name, stock, fast in (
+            (
+                "users",
+                lambda: UserDataSerializer(users, many=True).data,
+                lambda: [fast_user_serializer.serialize(user) for user in users],
+            ),
+            (
+                "guesses",
+                lambda: GuessSerializer(guesses, many=True).data,
+                lambda: [fast_guess_serializer.serialize(guess) for guess in guesses],
+            ),
+        ):
+            stock_data = stock()
+            fast_data = fast()
+
+            if [dict(item) for item in stock_data] != fast_data:
+                self.stderr.write(f"{name}: outputs of stock and fast path differ")
+
+            rows = [
+                ("serialize, DRF", stock),
+                ("serialize, fast", fast),
+                ("render, JSONRenderer", lambda: JSONRenderer().render(stock_data)),
+                ("render, FastJSONRenderer", lambda: FastJSONRenderer().render(fast_data)),
+            ]
+
+            for label, function in rows:
+                per_object = self._measure(function, repeat) / n
+                self.stdout.write(f"{name:8s} {label:26s} {1e6 * per_object:8.2f} µs/object")
+
+    def _measure(self, function, repeat):
+        """
+        Returns:
+            seconds: best time of one call out of repeat calls
+        """
+        best = float("inf")
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - start)
+
+        return best
@@ -0,0 +1,44 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from semantus_app.ann import build_index
+from semantus_app.similarity import get_engine
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the approximate nearest-neighbor index (IVF) of the current embedding store. "
+        "Use benchmark_ann to choose --lists and SEMANTUS_ANN_NPROBE."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lists",
+            type=int,
+            default=None,
+            help="Number of inverted lists (default: about 4 * sqrt(number of words)).",
+        )
+        parser.add_argument("--iterations", type=int, default=10)
+        parser.add_argument(
+            "--sample", type=int, default=100000, help="Vectors the centroids are trained on."
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **kwargs):
+        words = len(get_engine().store)
+        lists = kwargs["lists"] or max(1, int(4 * words**0.5))
+
+        start = time.perf_counter()
+        index = build_index(lists, kwargs["iterations"], kwargs["sample"], kwargs["seed"])
+
+        sizes = index.offsets[1:] - index.offsets[:-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Built index with {index.lists} lists over {words} words "
+                f"in {time.perf_counter() - start:.1f}s "
+                f"(list sizes: min {sizes.min()}, median {int(np.median(sizes))}, max {sizes.max()})"
+            )
+        )
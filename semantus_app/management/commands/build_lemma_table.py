@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from semantus_app.models import WordData, LemmaLookup
+from semantus_app.lemmatizer import lemmatize_many
+
+
+class Command(BaseCommand):
+    help = "Precomputes the LemmaLookup table from the vocabulary in WordData."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs["batch_size"]
+        vocabulary = set(WordData.objects.values_list("word", flat=True))
+
+        # players type words in lower case or capitalized, so we precompute these variants as well
+        surfaces = set()
+        for word in vocabulary:
+            if word:
+                surfaces.update((word, word.lower(), word.capitalize()))
+
+        surfaces = sorted(surfaces)
+        created = 0
+
+        for start in range(0, len(surfaces), batch_size):
+            batch = surfaces[start : start + batch_size]
+            lemmas = lemmatize_many(batch, batch_size=batch_size)
+
+            # only store mappings that resolve to a word of the vocabulary
+            entries = [
+                LemmaLookup(surface=surface, lemma=lemma)
+                for surface, lemma in zip(batch, lemmas)
+                if lemma in vocabulary and len(surface) <= 100
+            ]
+            LemmaLookup.objects.bulk_create(entries, ignore_conflicts=True)
+            created += len(entries)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Stored {created} surface forms in LemmaLookup")
+        )
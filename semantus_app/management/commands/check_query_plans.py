@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from semantus_app import friends, usernames
+from semantus_app.models import GameGuesses, GameParticipants, UserData
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks that the hot queries of the game are answered with index scans. "
+        "Fails if one of them scans a whole table or sorts without an index."
+    )
+
+    def handle(self, *args, **kwargs):
+        queries = {
+            "participant lookup": GameParticipants.objects.filter(
+                game_id__game_id="game", user_id=1
+            ),
+            "duplicate guess check": GameGuesses.objects.filter(game_id=1, guess="Wort"),
+            "guesses of user": GameGuesses.objects.filter(game_id=1, user_id=1),
+            "best guesses": GameGuesses.objects.filter(game_id=1).order_by("-similarity")[:10],
+            "games of user": GameParticipants.objects.filter(user_id=1),
+            "leaderboard": UserData.objects.order_by("-points", "id")[:100],
+            "username check": usernames.lookup("Name"),
+            "contacts of user": friends._contacts_query(1),
+        }
+
+        # small tables would otherwise be scanned sequentially by PostgreSQL
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan = off;")
+
+        failures = []
+
+        for name, queryset in queries.items():
+            plan = queryset.explain()
+            problems = self._problems(plan)
+
+            if problems:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: {', '.join(problems)}"))
+                self.stdout.write(plan)
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: uses indexes"))
+
+        if failures:
+            raise CommandError(f"Queries without index support: {', '.join(failures)}")
+
+    def _problems(self, plan):
+        """
+        Returns:
+            problems: list of plan steps that indicate a full table scan or an unindexed sort
+        """
+        problems = []
+
+        for line in plan.splitlines():
+            step = line.strip()
+
+            # SQLite: "SCAN <table>" without an index, or sorting in a temporary b-tree
+            if connection.vendor == "sqlite":
+                if " SCAN " in f" {step} " and "USING" not in step:
+                    problems.append(step)
+                elif "USE TEMP B-TREE" in step:
+                    problems.append(step)
+
+            # PostgreSQL: sequential scans and explicit sorts
+            elif "Seq Scan" in step or step.startswith("Sort") or "-> Sort" in step:
+                problems.append(step)
+
+        return problems
@@ -0,0 +1,132 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from semantus_app.tokens import CachingVerifier, FakeVerifier, InvalidToken
+
+
+class CountingVerifier:
+    """
+    Wraps a verifier and counts how often each token reaches it
+    """
+
+    def __init__(self, verifier):
+        self.verifier = verifier
+        self.calls = Counter()
+
+    def verify(self, token):
+        self.calls[token] += 1
+        return self.verifier.verify(token)
+
+
+class FixedClaimsVerifier:
+    """
+    Accepts every token and returns the same claims (e.g. an expired "exp")
+    """
+
+    def __init__(self, claims):
+        self.claims = claims
+
+    def verify(self, token):
+        return dict(self.claims)
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks that CachingVerifier caches verified tokens until they expire, evicts the "
+        "least recently used token and rejects tokens that are expired or have no expiry. "
+        "Uses FakeVerifier, so neither firebase nor a database is needed."
+    )
+
+    def handle(self, *args, **kwargs):
+        checks = {
+            "repeated token is served from the cache": self._check_hit,
+            "expired cache entry is verified again": self._check_expiry,
+            "least recently used token is evicted": self._check_eviction,
+            "invalid token is not cached": self._check_invalid,
+            "expired token is rejected": self._check_expired_token,
+            "token without expiry is rejected": self._check_missing_expiry,
+        }
+
+        failures = []
+
+        for name, check in checks.items():
+            problem = check()
+
+            if problem:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: {problem}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ok"))
+
+        if failures:
+            raise CommandError(f"Failed checks: {', '.join(failures)}")
+
+    def _verifier(self, lifetime=3600, maxsize=10):
+        counting = CountingVerifier(FakeVerifier(latency=0, lifetime=lifetime))
+        return CachingVerifier(counting, maxsize=maxsize), counting.calls
+
+    def _check_hit(self):
+        verifier, calls = self._verifier()
+
+        for _ in range(3):
+            verifier.verify("fake:alice")
+
+        if calls["fake:alice"] != 1:
+            return f"verified {calls['fake:alice']} times instead of once"
+
+    def _check_expiry(self):
+        verifier, calls = self._verifier(lifetime=1)
+
+        verifier.verify("fake:alice")
+        time.sleep(1.1)
+
+        # FakeVerifier issues a new expiry, so the second verification succeeds
+        verifier.verify("fake:alice")
+
+        if calls["fake:alice"] != 2:
+            return "expired entry was served from the cache"
+
+    def _check_eviction(self):
+        verifier, calls = self._verifier(maxsize=2)
+
+        for token in ("fake:alice", "fake:bob", "fake:alice", "fake:carol", "fake:alice"):
+            verifier.verify(token)
+
+        verifier.verify("fake:bob")
+
+        if calls["fake:alice"] != 1:
+            return "recently used token was evicted"
+
+        if calls["fake:bob"] != 2:
+            return "least recently used token was not evicted"
+
+    def _check_invalid(self):
+        verifier, calls = self._verifier()
+
+        for _ in range(2):
+            try:
+                verifier.verify("not-a-token")
+                return "invalid token was accepted"
+            except InvalidToken:
+                pass
+
+        if calls["not-a-token"] != 2:
+            return "rejection was cached"
+
+    def _check_expired_token(self):
+        return self._check_rejected({"uid": "alice", "exp": int(time.time()) - 60})
+
+    def _check_missing_expiry(self):
+        return self._check_rejected({"uid": "alice"})
+
+    def _check_rejected(self, claims):
+        verifier = CachingVerifier(FixedClaimsVerifier(claims))
+
+        try:
+            verifier.verify("token")
+        except InvalidToken:
+            return None
+
+        return "token was accepted"
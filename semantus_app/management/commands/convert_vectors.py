@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from semantus_app.models import WordData
+from semantus_app.embeddings import write_store, parse_vector
+from semantus_app.settings import embedding_dtype
+
+import numpy as np
+
+
+class Command(BaseCommand):
+    help = "Converts the text vectors of WordData into the binary embedding store."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dtype",
+            choices=["float32", "float16", "int8"],
+            default=embedding_dtype,
+            help="Precision of the stored matrix.",
+        )
+        parser.add_argument(
+            "--drop-text",
+            action="store_true",
+            help="Clear WordData.vector after the conversion to reclaim space.",
+        )
+
+    def handle(self, *args, **kwargs):
+        words = []
+        vectors = []
+
+        queryset = (
+            WordData.objects.filter(vector__isnull=False)
+            .order_by("id")
+            .values_list("word", "vector")
+        )
+
+        for word, vector in queryset.iterator(chunk_size=2000):
+            words.append(word)
+            vectors.append(parse_vector(vector))
+
+        if not words:
+            self.stdout.write(self.style.WARNING("No text vectors found, nothing to do."))
+            return
+
+        write_store(words, np.vstack(vectors), dtype=kwargs["dtype"])
+
+        # reference the rows of the embedding store from WordData
+        with transaction.atomic():
+            WordData.objects.update(row=None)
+
+            entries = list(
+                WordData.objects.filter(vector__isnull=False).only("id", "word")
+            )
+            rows = {word: row for row, word in enumerate(words)}
+
+            for entry in entries:
+                entry.row = rows[entry.word]
+
+            WordData.objects.bulk_update(entries, ["row"], batch_size=1000)
+
+            if kwargs["drop_text"]:
+                WordData.objects.update(vector=None)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Converted {len(words)} vectors to the embedding store")
+        )
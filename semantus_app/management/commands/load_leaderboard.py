@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from semantus_app import leaderboard
+from semantus_app.settings import leaderboard_redis_url
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads the ranking of all users into the leaderboard that workers share through "
+        "Redis (SEMANTUS_LEADERBOARD_REDIS_URL). Workers keep it up to date afterwards."
+    )
+
+    def handle(self, *args, **kwargs):
+        if not leaderboard_redis_url:
+            raise CommandError("SEMANTUS_LEADERBOARD_REDIS_URL is not set.")
+
+        shared = leaderboard.RedisLeaderboard(leaderboard_redis_url)
+        leaderboard.load(shared)
+
+        self.stdout.write(self.style.SUCCESS(f"Loaded {len(shared)} users into the leaderboard."))
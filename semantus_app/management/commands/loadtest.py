@@ -0,0 +1,103 @@
+import asyncio
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends concurrent requests to a running server and reports throughput and latency. "
+        "Run it against a single sync worker (WSGI) and a single async worker (ASGI) to "
+        "compare both stacks, e.g. with SEMANTUS_TOKEN_VERIFIER=semantus_app.tokens.FakeVerifier "
+        "and SEMANTUS_FAKE_VERIFIER_LATENCY=0.05 to simulate firebase."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="e.g. http://localhost:8000/login/")
+        parser.add_argument("--method", default="GET")
+        parser.add_argument("--token", default="fake:loadtest", help="Authorization header.")
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--timeout", type=float, default=30)
+
+    def handle(self, *args, **kwargs):
+        url = urlsplit(kwargs["url"])
+
+        if url.scheme != "http":
+            raise CommandError("Only http URLs are supported.")
+
+        latencies, statuses, elapsed = asyncio.run(self._run(url, kwargs))
+
+        latencies.sort()
+        self.stdout.write(f"{kwargs['method']} {kwargs['url']}")
+        self.stdout.write(
+            f"Requests: {len(latencies)}, concurrency: {kwargs['concurrency']}, "
+            f"duration: {elapsed:.2f}s"
+        )
+        self.stdout.write(f"Throughput: {len(latencies) / elapsed:.1f} requests/s")
+
+        if latencies:
+            self.stdout.write(
+                "Latency: p50 {:.1f} ms, p90 {:.1f} ms, p99 {:.1f} ms".format(
+                    *(1000 * latencies[int(len(latencies) * q)] for q in (0.5, 0.9, 0.99))
+                )
+            )
+
+        self.stdout.write(
+            "Status codes: "
+            + ", ".join(f"{code}: {count}" for code, count in sorted(statuses.items()))
+        )
+
+    async def _run(self, url, options):
+        path = url.path or "/"
+
+        if url.query:
+            path += "?" + url.query
+
+        request = (
+            f"{options['method']} {path} HTTP/1.1\r\n"
+            f"Host: {url.netloc}\r\n"
+            f"Authorization: {options['token']}\r\n"
+            "Content-Length: 0\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode()
+
+        latencies = []
+        statuses = Counter()
+        remaining = options["requests"]
+
+        async def send():
+            reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+
+            try:
+                writer.write(request)
+                await writer.drain()
+
+                status_line = await reader.readline()
+                await reader.read()
+
+                return int(status_line.split()[1])
+            finally:
+                writer.close()
+
+        async def worker():
+            nonlocal remaining
+
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+
+                try:
+                    status = await asyncio.wait_for(send(), options["timeout"])
+                except Exception as e:
+                    status = type(e).__name__
+
+                latencies.append(time.perf_counter() - start)
+                statuses[str(status)] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(options["concurrency"])))
+
+        return latencies, statuses, time.perf_counter() - start
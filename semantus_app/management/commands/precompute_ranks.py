@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from semantus_app.models import Game, WordData
+from semantus_app.ranking import ensure_rank_table
+
+
+class Command(BaseCommand):
+    help = "Precomputes the rank tables (nearest neighbors) of target words."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Precompute rank tables for every word in WordData instead of only active games.",
+        )
+        parser.add_argument("words", nargs="*", help="Additional target words.")
+
+    def handle(self, *args, **kwargs):
+        words = WordData.objects.filter(row__isnull=False)
+
+        if not kwargs["all"]:
+            active = Game.objects.values("word_id")
+            words = words.filter(id__in=active) | words.filter(word__in=kwargs["words"])
+
+        rows = list(words.values_list("row", flat=True).distinct())
+        created = 0
+        start = time.perf_counter()
+
+        for i, row in enumerate(rows, start=1):
+            created += ensure_rank_table(row)
+
+            if i % 1000 == 0:
+                self.stdout.write(f"{i}/{len(rows)} target words processed")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Computed {created} new rank tables for {len(rows)} target words "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+        )
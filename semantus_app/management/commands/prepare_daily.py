@@ -0,0 +1,26 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from semantus_app import daily
+
+
+class Command(BaseCommand):
+    help = "Precomputes the daily puzzles (target word and ranking) of the next days."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=3, help="Number of days starting today."
+        )
+
+    def handle(self, *args, **kwargs):
+        today = timezone.localdate()
+
+        for offset in range(kwargs["days"]):
+            day = today + datetime.timedelta(days=offset)
+            puzzle = daily.prepare(day)
+
+            self.stdout.write(f"{day.isoformat()}: prepared puzzle #{puzzle.metadata()['number']}")
+
+        self.stdout.write(self.style.SUCCESS(f"Prepared {kwargs['days']} daily puzzles"))
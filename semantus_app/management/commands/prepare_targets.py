@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from semantus_app import targets
+from semantus_app.settings import difficulty_tiers, target_candidates
+
+
+class Command(BaseCommand):
+    help = (
+        "Scores the most frequent words by difficulty (frequency and neighborhood density), "
+        "saves their rank tables and rebuilds the shuffled target pool of every tier."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--candidates",
+            type=int,
+            default=target_candidates,
+            help="Number of most frequent words that are considered as targets.",
+        )
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **kwargs):
+        start = time.perf_counter()
+
+        def progress(done):
+            if done % 2560 == 0:
+                self.stdout.write(f"{done} candidates scored")
+
+        sizes = targets.prepare(kwargs["candidates"], kwargs["seed"], progress)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Prepared target pools ({}) in {:.1f}s".format(
+                    ", ".join(f"{tier}: {size}" for tier, size in zip(difficulty_tiers, sizes)),
+                    time.perf_counter() - start,
+                )
+            )
+        )
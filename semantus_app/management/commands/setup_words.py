@@ -1,35 +1,33 @@
 import os
-from collections import defaultdict
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
 from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from semantus_app.models import Game, WordData, LemmaLookup
+from semantus_app.embeddings import EmbeddingStore, write_store, prune_versions
+from semantus_app.ingestion import (
+    Checkpoint,
+    content_hash,
+    init_worker,
+    process_chunk,
+)
+from semantus_app.ranking import ensure_rank_table
+from semantus_app.settings import embedding_dir
 
-from semantus_app.models import WordData
-import spacy
 import numpy as np
 
 
 class Command(BaseCommand):
     help = "Initializes WordData with lemmatized words in German."
 
-    def handle(self, *args, **kwargs):
-        # load spacy model
-        nlp = spacy.load("de_core_news_sm")
-
-        def lemmatize_german_word(word_to_lemmatize):
-            """
-            Lemmatizes a word in German (i.e. returns the base form of the word)
-
-            Parameters:
-                word_to_lemmatize: word to lemmatize
-
-            Returns:
-                lemma: base form of the word
-            """
-            return nlp(word_to_lemmatize)[0].lemma_
-
-        # check that WordData table is empty
-        if not WordData.objects.exists():
-            # path to embeddings file (relative to current location)
-            file_path = os.path.join(
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default=os.path.join(
                 os.path.dirname(
                     os.path.dirname(
                         os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -37,59 +35,265 @@ class Command(BaseCommand):
                 ),
                 "embeddings",
                 "german-embeddings.txt",
+            ),
+            help="Path to the embeddings file.",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Update an existing vocabulary: only new or changed words are written.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the checkpoint of an interrupted import and start from the beginning.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of processes that parse and lemmatize the file.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Number of lines that are processed together.",
+        )
+        parser.add_argument(
+            "--checkpoint-every",
+            type=int,
+            default=50,
+            help="Number of chunks between two checkpoints.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Number of rows per bulk insert.",
+        )
+
+    def handle(self, *args, **kwargs):
+        # a full import requires an empty WordData table
+        if WordData.objects.exists() and not kwargs["incremental"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    "WordData table is not empty, skipping population. "
+                    "Use --incremental to update the vocabulary or delete db.sqlite3 to repopulate."
+                )
             )
+            return
 
-            # dictionary of all words
-            all_words = defaultdict(list)
+        file_path = kwargs["file"]
+        file_size = os.path.getsize(file_path)
+        start = time.perf_counter()
 
-            # load embeddings file
-            with open(file_path, "r", encoding="utf-8") as file:
-                for line in file:
-                    # remove line breaks
-                    line = line.replace("\n", "")
+        # resume an interrupted import of the same file
+        checkpoint = Checkpoint(os.path.join(embedding_dir, "import.checkpoint.npz"), file_path)
 
-                    # get all components
-                    components = line.split(" ")
+        if kwargs["restart"]:
+            checkpoint.delete()
 
-                    # decode word and obtain lemma
-                    word = (
-                        components[0][2:-1].encode("latin-1").decode("unicode-escape")
-                    )
-                    word = word.encode("latin1").decode("utf-8")
+        # running mean of the vectors of each lemma and
+        # surface forms and their lemma (used to populate LemmaLookup)
+        offset, aggregator, surface_forms = checkpoint.load()
 
-                    lemma = lemmatize_german_word(word)
+        if offset:
+            self.stdout.write(
+                f"Resuming import at byte {offset} ({100 * offset / max(file_size, 1):.1f}%)"
+            )
 
-                    # append lemma and vector to all_words
-                    all_words[lemma].append(
-                        [float(component) for component in components[1:-1]]
-                    )
+        lines = 0
+        consumed = 0
 
-            # iterate through lemmatized words and add them to WordData table
-            for word, vectors in all_words.items():
-                if len(vectors) > 1:
-                    # average embeddings that get lemmatized to the same word
-                    np_vectors = np.array(vectors)
-                    average_vector = np.mean(np_vectors, axis=0)
-
-                    # convert np-array to list and create entry in WordData table
-                    WordData.objects.create(
-                        word=word,
-                        vector=" ".join(
-                            map(lambda x: str(round(x, 6)), average_vector.tolist())
-                        ),
-                    )
-                else:
-                    # create entry in WordData table
-                    WordData.objects.create(
-                        word=word, vector=" ".join(map(str, vectors[0]))
-                    )
+        def consume(result, position):
+            nonlocal lines, consumed
 
-            self.stdout.write(
-                self.style.SUCCESS("Successfully populated WordData table")
+            words, lemmas, matrix = result
+            aggregator.add(lemmas, matrix)
+            lines += len(words)
+            consumed += 1
+
+            for word, lemma in zip(words, lemmas):
+                if lemma is not None:
+                    surface_forms[word] = lemma
+
+            if consumed % kwargs["checkpoint_every"] == 0:
+                checkpoint.save(position, aggregator, surface_forms)
+
+            self._report_progress(position, offset, file_size, lines, start)
+
+        with open(file_path, "rb") as file:
+            file.seek(offset)
+
+            # every chunk is paired with the byte offset right after its last line
+            def read_chunks():
+                while True:
+                    chunk = list(islice(file, kwargs["chunk_size"]))
+
+                    if not chunk:
+                        return
+
+                    yield chunk, file.tell()
+
+            if kwargs["workers"] > 1:
+                with ProcessPoolExecutor(
+                    max_workers=kwargs["workers"], initializer=init_worker
+                ) as executor:
+                    # keep a bounded number of chunks in flight to limit memory usage
+                    pending = deque()
+
+                    for chunk, position in read_chunks():
+                        pending.append((executor.submit(process_chunk, chunk), position))
+
+                        if len(pending) >= 2 * kwargs["workers"]:
+                            future, position = pending.popleft()
+                            consume(future.result(), position)
+
+                    while pending:
+                        future, position = pending.popleft()
+                        consume(future.result(), position)
+            else:
+                for chunk, position in read_chunks():
+                    consume(process_chunk(chunk), position)
+
+        checkpoint.save(file_size, aggregator, surface_forms)
+
+        parsed = time.perf_counter()
+        self.stdout.write("")
+        self.stdout.write(
+            f"Parsed {lines} lines into {len(aggregator)} lemmas in {parsed - start:.1f}s "
+            f"({lines / max(parsed - start, 1e-9):.0f} lines/s)"
+        )
+
+        words, matrix = aggregator.result()
+        created, updated = self._write(words, matrix, surface_forms, kwargs["batch_size"])
+
+        checkpoint.delete()
+        prune_versions()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully populated WordData table: {created} new and {updated} changed words "
+                f"in {elapsed:.1f}s ({lines / max(elapsed, 1e-9):.0f} lines/s)"
+            )
+        )
+
+    def _write(self, words, matrix, surface_forms, batch_size):
+        """
+        Publishes a new version of the embedding store and upserts new or changed
+        words. Words that already exist keep their row, so WordData stays valid
+        for the store that is being served until the new version is published.
+
+        Returns:
+            created: number of new words
+            updated: number of words whose embedding changed
+        """
+        existing = {
+            word: (pk, row, digest)
+            for pk, word, row, digest in WordData.objects.values_list(
+                "id", "word", "row", "content_hash"
             )
-        else:
+        }
+
+        # start from the served store so that words missing in the file are kept
+        try:
+            store = EmbeddingStore.load() if existing else None
+        except FileNotFoundError:
+            store = None
+
+        all_words = list(store.words) if store is not None else []
+        store_size = len(all_words)
+        base = np.array(store.matrix[:], dtype=np.float32) if store is not None else None
+
+        new_entries = []
+        changed_entries = []
+        new_vectors = []
+
+        # longer words do not fit into WordData.word (PostgreSQL would abort the import)
+        max_length = WordData._meta.get_field("word").max_length
+        skipped = 0
+
+        for word, vector in zip(words, matrix):
+            if len(word) > max_length:
+                skipped += 1
+                continue
+
+            digest = content_hash(vector)
+            pk, row, old_digest = existing.get(word, (None, None, None))
+
+            # words that are already served keep their row
+            if row is not None and row < store_size:
+                if digest != old_digest:
+                    base[row] = vector
+                    changed_entries.append(WordData(pk=pk, row=row, content_hash=digest))
+
+                continue
+
+            row = len(all_words)
+            all_words.append(word)
+            new_vectors.append(vector)
+
+            if pk is None:
+                new_entries.append(WordData(word=word, row=row, content_hash=digest))
+            else:
+                changed_entries.append(WordData(pk=pk, row=row, content_hash=digest))
+
+        if skipped:
             self.stdout.write(
-                self.style.WARNING(
-                    "WordData table is not empty, skipping population. Delete db.sqlite3 to repopulate."
-                )
+                self.style.WARNING(f"Skipped {skipped} words longer than {max_length} characters")
             )
+
+        vectors = [base] if base is not None else []
+
+        if new_vectors:
+            vectors.append(np.vstack(new_vectors))
+
+        # swap in the new store atomically while the server keeps serving the old one
+        if new_entries or changed_entries:
+            write_store(all_words, np.vstack(vectors))
+
+        with transaction.atomic():
+            # without a store, rows of existing words are meaningless
+            if store is None:
+                WordData.objects.update(row=None)
+
+            for offset in range(0, len(new_entries), batch_size):
+                WordData.objects.bulk_create(new_entries[offset : offset + batch_size])
+
+            WordData.objects.bulk_update(
+                changed_entries, ["row", "content_hash"], batch_size=batch_size
+            )
+
+            # store surface forms so that guesses resolve without running spaCy
+            LemmaLookup.objects.bulk_create(
+                [
+                    LemmaLookup(surface=surface, lemma=lemma)
+                    for surface, lemma in surface_forms.items()
+                    if len(surface) <= 100 and len(lemma) <= max_length
+                ],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+
+        # active games need their rank tables in the new version of the store
+        for row in WordData.objects.filter(id__in=Game.objects.values("word_id")).values_list(
+            "row", flat=True
+        ):
+            if row is not None:
+                ensure_rank_table(row)
+
+        return len(new_entries), len(changed_entries)
+
+    def _report_progress(self, position, offset, file_size, lines, start):
+        """
+        Prints the share of the file that has been processed and the current throughput
+        """
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"\r{100 * position / max(file_size, 1):5.1f}% | {lines} lines | "
+            f"{lines / max(elapsed, 1e-9):.0f} lines/s | "
+            f"{(position - offset) / max(elapsed, 1e-9) / 2**20:.1f} MB/s",
+            ending="",
+        )
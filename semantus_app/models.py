@@ -3,6 +3,9 @@ Django models define the format of data in the database. We have a database for
 a database for contact data, and a database for words.
 """
 from django.db import models
+from django.db.models.functions import Lower
+
+from .ids import new_id
 
 
 class UserData(models.Model):
@@ -20,10 +23,31 @@ class UserData(models.Model):
 
     # game logic attributes
     current_singleplayer_word = models.CharField(max_length=20, default="word_id")
-    current_multiplayer_game_id = models.CharField(max_length=20, default="game_id")
+    current_multiplayer_game_id = models.CharField(max_length=26, default="game_id")
 
     REQUIRED_FIELDS = ["firebase_id", "username"]
 
+    class Meta:
+        indexes = [
+            # leaderboard (covering on PostgreSQL, so public fields come from the index)
+            models.Index(
+                fields=["-points", "id"],
+                name="userdata_points_idx",
+                include=["username", "avatar"],
+            ),
+        ]
+        constraints = [
+            # usernames are unique regardless of case, the index also serves availability checks
+            models.UniqueConstraint(Lower("username"), name="userdata_username_lower_uniq"),
+        ]
+
+    @property
+    def is_authenticated(self):
+        """
+        Users are only instantiated for authenticated requests (see FirebaseAuthentication)
+        """
+        return True
+
 
 class Contact(models.Model):
     """
@@ -44,6 +68,16 @@ class Contact(models.Model):
     # is contact request still pending
     pending = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # contacts of a user are read from both sides (see friends.py)
+            models.Index(fields=["user1", "pending"], name="contact_user1_idx"),
+            models.Index(fields=["user2", "pending"], name="contact_user2_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["user1", "user2"], name="unique_contact"),
+        ]
+
 
 class WordData(models.Model):
     """
@@ -52,20 +86,70 @@ class WordData(models.Model):
 
     word_id = models.CharField(max_length=20, unique=True, null=True)
     word = models.CharField(max_length=20, unique=True, null=True)
+
+    # row of the word in the embedding store (see embeddings.py)
+    row = models.IntegerField(unique=True, null=True)
+
+    # hash of the embedding, used to detect changed words in incremental imports
+    content_hash = models.CharField(max_length=40, null=True)
+
+    # legacy text representation of the embedding, converted by convert_vectors
     vector = models.TextField(null=True)
 
+    # difficulty tier of the word as a target (index into difficulty_tiers, see targets.py)
+    difficulty = models.SmallIntegerField(null=True)
+
+    # position of the word in the shuffled target pool of its tier
+    pool_position = models.IntegerField(null=True)
+
+    # mean similarity of the nearest neighbors (higher = easier to approach)
+    density = models.FloatField(null=True)
+
+    class Meta:
+        indexes = [
+            # picking the next target of a tier
+            models.Index(fields=["difficulty", "pool_position"], name="word_target_pool_idx"),
+        ]
+
+
+class LemmaLookup(models.Model):
+    """
+    Table that maps surface forms of words to their lemma
+    """
+
+    surface = models.CharField(max_length=100, unique=True)
+    lemma = models.CharField(max_length=20)
+
+
+class TargetPool(models.Model):
+    """
+    Shuffled pool of target words of a difficulty tier. Games take the words of
+    a pool in order, so targets do not repeat until the pool is exhausted.
+    """
+
+    difficulty = models.SmallIntegerField(unique=True)
+    size = models.IntegerField(default=0)
+    next_position = models.IntegerField(default=0)
+
 
 class Game(models.Model):
     """
     Table of games
     """
 
-    game_id = models.CharField(max_length=20, unique=True, null=True)
+    # public id (time-ordered ULID, see ids.py), joins use the integer primary key
+    game_id = models.CharField(max_length=26, unique=True, null=True, default=new_id)
     game_type = models.CharField(max_length=20, default="coop")
     creator_id = models.ForeignKey(UserData, on_delete=models.CASCADE, related_name="+")
     start_time = models.DateTimeField(auto_now_add=True)
     word_id = models.ForeignKey(WordData, on_delete=models.CASCADE, related_name="+")
 
+    class Meta:
+        indexes = [
+            # game history of a user
+            models.Index(fields=["creator_id", "-start_time"], name="game_creator_history_idx"),
+        ]
+
 
 class GameParticipants(models.Model):
     """
@@ -76,6 +160,18 @@ class GameParticipants(models.Model):
     user_id = models.ForeignKey(UserData, on_delete=models.CASCADE, related_name="+")
     best_guess = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        constraints = [
+            # every user joins a game at most once (also serves lookups by game and user)
+            models.UniqueConstraint(
+                fields=["game_id", "user_id"], name="unique_participant_per_game"
+            ),
+        ]
+        indexes = [
+            # games a user takes part in
+            models.Index(fields=["user_id", "game_id"], name="participant_user_games_idx"),
+        ]
+
 
 class GameGuesses(models.Model):
     """
@@ -84,9 +180,21 @@ class GameGuesses(models.Model):
 
     game_id = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="+")
     user_id = models.ForeignKey(UserData, on_delete=models.CASCADE, related_name="+")
-    guess = models.CharField(max_length=20, unique=True, null=True)
+    guess = models.CharField(max_length=20, null=True)
     similarity = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        constraints = [
+            # a word can be guessed once per game (and in any number of games)
+            models.UniqueConstraint(fields=["game_id", "guess"], name="unique_guess_per_game"),
+        ]
+        indexes = [
+            # guesses of a user in a game
+            models.Index(fields=["game_id", "user_id"], name="guess_game_user_idx"),
+            # best guesses of a game
+            models.Index(fields=["game_id", "-similarity"], name="guess_game_similarity_idx"),
+        ]
+
 
 class GameInvitations(models.Model):
     """
@@ -96,3 +204,9 @@ class GameInvitations(models.Model):
     game_id = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="+")
     user_id = models.ForeignKey(UserData, on_delete=models.CASCADE, related_name="+")
     accepted = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # open invitations of a user
+            models.Index(fields=["user_id", "accepted"], name="invitation_user_open_idx"),
+        ]
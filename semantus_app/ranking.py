@@ -0,0 +1,182 @@
+"""
+Rank tables hold the nearest neighbors of a target word in order of similarity.
+They are computed once per target (with argpartition instead of sorting the
+whole vocabulary), saved next to the version of the embedding store they were
+computed from and cached in memory, so that the rank of a guess is a dictionary
+lookup.
+"""
+
+import os
+
+import numpy as np
+
+from .ann import nearest
+from .caches import LRUCache
+from .settings import ann_rank_tables, rank_table_size, rank_table_cache_size
+from .similarity import get_engine
+
+RANKS_DIR = "ranks"
+
+cache = LRUCache("rank_tables", rank_table_cache_size)
+
+
+class RankTable:
+    """
+    Nearest neighbors of a target word. Rank 0 is the target itself, rank 1 the
+    most similar other word.
+    """
+
+    def __init__(self, target_row, neighbors):
+        self.target_row = target_row
+        self.neighbors = neighbors
+        self.ranks = {int(row): rank for rank, row in enumerate(neighbors, start=1)}
+
+    def rank(self, row):
+        """
+        Returns:
+            rank: rank of the word in row (0 for the target) or None if it is not among
+                the nearest neighbors
+        """
+        if row == self.target_row:
+            return 0
+
+        return self.ranks.get(row)
+
+    def __len__(self):
+        return len(self.neighbors)
+
+
+def compute_neighbors(target_row, k=rank_table_size, engine=None, approximate=ann_rank_tables):
+    """
+    Computes the k nearest neighbors of a word of the embedding store
+
+    Parameters:
+        target_row: row of the target word
+        k: number of neighbors
+        engine: SimilarityEngine (defaults to the engine of this process)
+        approximate: use the approximate index if it has been built (see ann.py)
+
+    Returns:
+        neighbors: int32 array of rows, ordered from most to least similar
+    """
+    engine = engine or get_engine()
+
+    # the approximate index only exists for the published store
+    if approximate and engine is get_engine():
+        neighbors = nearest(target_row, k)
+
+        if neighbors is not None:
+            return neighbors
+
+    scores = engine.similarities_to_all(
+        np.asarray(engine.vectors[target_row], dtype=np.float32)
+    )
+
+    # the target is not a neighbor of itself
+    scores[target_row] = -np.inf
+    k = min(k, len(scores) - 1)
+
+    # select the k best rows in linear time and only sort those
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    neighbors = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    return neighbors.astype(np.int32)
+
+
+def _path(target_row, store):
+    return os.path.join(store.directory, RANKS_DIR, f"{target_row}.npy")
+
+
+def save_rank_table(target_row, neighbors, store):
+    path = _path(target_row, store)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path + ".tmp", "wb") as file:
+        np.save(file, neighbors)
+
+    os.replace(path + ".tmp", path)
+
+
+def get_rank_table(target_row):
+    """
+    Returns the rank table of a target word. The table is loaded from disk or
+    computed (and saved) if it does not exist yet.
+
+    Parameters:
+        target_row: row of the target word in the embedding store
+
+    Returns:
+        table: RankTable
+    """
+    engine = get_engine()
+    store = engine.store
+
+    # rank tables of older versions of the store are never hit again and get evicted
+    key = (store.version, target_row)
+    table = cache.get(key)
+
+    if table is not None:
+        return table
+
+    path = _path(target_row, store)
+
+    if os.path.exists(path):
+        neighbors = np.load(path)
+    else:
+        neighbors = compute_neighbors(target_row, engine=engine)
+        save_rank_table(target_row, neighbors, store)
+
+    table = RankTable(target_row, neighbors)
+    cache.set(key, table)
+
+    return table
+
+
+def ensure_rank_table(target_row):
+    """
+    Computes and saves the rank table of a target word unless it exists already
+
+    Returns:
+        created: True if the table had to be computed
+    """
+    engine = get_engine()
+
+    if os.path.exists(_path(target_row, engine.store)):
+        return False
+
+    save_rank_table(target_row, compute_neighbors(target_row, engine=engine), engine.store)
+    return True
+
+
+def rank(target, word):
+    """
+    Returns:
+        rank: rank of word among the nearest neighbors of target (0 if word is the
+            target, None if it is not among them)
+    """
+    store = get_engine().store
+    target_row = store.row(target)
+    row = store.row(word)
+
+    if target_row is None or row is None:
+        return None
+
+    return get_rank_table(target_row).rank(row)
+
+
+def ranks(target, words):
+    """
+    Returns:
+        ranks: list of ranks of words among the nearest neighbors of target
+            (0 for the target, None for words that are not among them) in the order of words
+    """
+    store = get_engine().store
+    target_row = store.row(target)
+
+    if target_row is None:
+        return [None] * len(words)
+
+    table = get_rank_table(target_row)
+    rows = [store.row(word) for word in words]
+
+    return [None if row is None else table.rank(row) for row in rows]
@@ -0,0 +1,52 @@
+"""
+JSON renderer for API responses. orjson is used if it is installed (it encodes
+large lists of dictionaries several times faster than the json module);
+otherwise the standard library is used with compact separators.
+"""
+
+import json
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def _default(value):
+    # orjson does not encode Decimal (e.g. GameParticipants.best_guess)
+    if isinstance(value, Decimal):
+        return float(value)
+
+    return _encoder.default(value)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement of DRF's JSONRenderer for compact (non-indented) responses
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        # indented output (e.g. ?indent=) is left to DRF
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if orjson is not None:
+            # non-string keys (e.g. None) and NumPy values are encoded like by the json module
+            return orjson.dumps(
+                data,
+                default=_default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+            )
+
+        return json.dumps(
+            data, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode()
@@ -0,0 +1,11 @@
+"""
+Routing of WebSocket connections to consumers (the WebSocket counterpart of urls.py).
+"""
+
+from django.urls import path
+
+from .consumers import GameConsumer
+
+websocket_urlpatterns = [
+    path("ws/game/<str:game_id>/", GameConsumer.as_asgi(), name="game-socket"),
+]
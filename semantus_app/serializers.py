@@ -1,7 +1,14 @@
 """
 Serializers are used to convert information obtained from Django database (stored in models) to JSON format.
+
+The ModelSerializers below introspect their fields on every call. Hot read
+endpoints use the read-only fast path at the end of this file instead: the
+fields are resolved once into an attrgetter (for model instances) or read from
+.values() rows, so serializing an object is a single tuple lookup.
 """
 
+from operator import attrgetter
+
 from rest_framework import serializers
 
 from .settings import all_fields
@@ -29,3 +36,72 @@ class GameDataSerializer(serializers.ModelSerializer):
         fields = []
 
         # additionally, return data from GameGuesses (i.e. guess, guesser, etc.)
+
+
+class FastSerializer:
+    """
+    Read-only serializer for a fixed list of fields
+
+    Parameters:
+        fields: names of the fields of the output
+        sources: names of the model fields the fields are read from, with __ for
+            relations (defaults to fields)
+        converters: dictionary that maps fields to functions applied to their value
+    """
+
+    def __init__(self, fields, sources=None, converters=None):
+        self.fields = tuple(fields)
+        self.sources = tuple(sources or fields)
+        self.converters = [
+            (self.fields.index(field), converter) for field, converter in (converters or {}).items()
+        ]
+
+        # lookups across relations (user_id__username) are attribute paths on instances
+        getter = attrgetter(*(source.replace("__", ".") for source in self.sources))
+        self._get = getter if len(self.sources) > 1 else lambda instance: (getter(instance),)
+
+    def _build(self, values):
+        if self.converters:
+            values = list(values)
+
+            for index, converter in self.converters:
+                if values[index] is not None:
+                    values[index] = converter(values[index])
+
+        return dict(zip(self.fields, values))
+
+    def serialize(self, instance):
+        """
+        Returns:
+            data: dictionary with the fields of a model instance
+        """
+        return self._build(self._get(instance))
+
+    def serialize_many(self, queryset):
+        """
+        Serializes all rows of a queryset with a single .values_list() query,
+        without instantiating model objects
+
+        Returns:
+            data: list of dictionaries
+        """
+        return [self._build(row) for row in queryset.values_list(*self.sources)]
+
+
+def _isoformat(value):
+    # same format as DRF's DateTimeField
+    value = value.isoformat()
+
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+
+    return value
+
+
+# same output as UserDataSerializer
+fast_user_serializer = FastSerializer(UserDataSerializer.Meta.fields)
+
+# public fields of games (game snapshots, see game_state.py)
+fast_game_serializer = FastSerializer(
+    ["game_id", "game_type", "start_time"], converters={"start_time": _isoformat}
+)
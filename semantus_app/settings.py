@@ -1,3 +1,6 @@
+import os
+from pathlib import Path
+
 all_fields = [
     "firebase_id",
     "username",
@@ -11,3 +14,121 @@ public_fields = [
     "username",
     "avatar",
 ]
+
+# spaCy pipeline used to lemmatize German words
+language_model = "de_core_news_sm"
+
+# pipeline components that are not needed for lemmatization
+disabled_components = ["parser", "ner"]
+
+# maximum number of surface forms kept in the in-process lemma cache
+lemma_cache_size = int(os.environ.get("SEMANTUS_LEMMA_CACHE_SIZE", 50000))
+
+# directory of the embedding store (memory-mapped matrix and word index)
+embedding_dir = Path(
+    os.environ.get(
+        "SEMANTUS_EMBEDDING_DIR",
+        Path(__file__).resolve().parent.parent / "embeddings",
+    )
+)
+
+# precision of the stored embeddings ("float32", "float16" or "int8", see QuantizedMatrix)
+embedding_dtype = os.environ.get("SEMANTUS_EMBEDDING_DTYPE", "float32")
+
+# seconds between checks whether a new version of the embedding store was published
+embedding_check_interval = 10
+
+# number of nearest neighbors that are ranked for each target word
+rank_table_size = 1000
+
+# maximum number of rank tables kept in memory per worker
+rank_table_cache_size = 256
+
+# lists of the approximate nearest-neighbor index that are scanned per query (see ann.py)
+ann_nprobe = int(os.environ.get("SEMANTUS_ANN_NPROBE", 16))
+
+# compute rank tables with the approximate index (if it has been built) instead of exact search
+ann_rank_tables = os.environ.get("SEMANTUS_ANN_RANK_TABLES", "0") == "1"
+
+# difficulty tiers of target words, from easiest to hardest (see targets.py)
+difficulty_tiers = ["easy", "medium", "hard"]
+
+# number of most frequent words (first rows of the store) that are considered as targets
+target_candidates = 20000
+
+# number of nearest neighbors whose mean similarity measures the density of a neighborhood
+density_neighbors = 10
+
+# ranks at which hints are picked (the largest rank better than the best guess of the user is used)
+hint_buckets = [1000, 500, 250, 100, 50, 20, 10, 5, 1]
+
+# class that verifies firebase tokens (FakeVerifier can be used for local development and tests)
+token_verifier = os.environ.get(
+    "SEMANTUS_TOKEN_VERIFIER", "semantus_app.tokens.FirebaseVerifier"
+)
+
+# seconds FakeVerifier waits before answering (simulates the latency of firebase)
+fake_verifier_latency = float(os.environ.get("SEMANTUS_FAKE_VERIFIER_LATENCY", 0))
+
+# maximum number of verified tokens kept in memory per worker
+token_cache_size = int(os.environ.get("SEMANTUS_TOKEN_CACHE_SIZE", 10000))
+
+# maximum number of users kept in memory per worker and seconds they are cached for
+user_cache_size = 10000
+user_cache_ttl = 30
+
+# pragmas executed on every new SQLite connection (write-ahead logging lets
+# readers continue while a guess is written)
+sqlite_pragmas = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,
+    "temp_store": "MEMORY",
+    "mmap_size": 268435456,
+}
+
+# seconds after which the in-memory set of taken usernames is reloaded from the database
+username_refresh_interval = 300
+
+# number of users whose contacts are cached, and seconds after which they are reloaded
+friends_cache_size = 10000
+friends_cache_ttl = 60
+
+# seconds after which the leaderboard of this worker is reloaded from the database
+leaderboard_refresh_interval = 60
+
+# share the leaderboard between workers through a Redis sorted set (local leaderboard if unset)
+leaderboard_redis_url = os.environ.get("SEMANTUS_LEADERBOARD_REDIS_URL")
+
+# maximum number of users returned by the leaderboard
+leaderboard_max_size = 100
+
+# seconds between two flushes of the in-memory game states to the database
+game_state_flush_interval = 1.0
+
+# number of pending changes of a game that trigger an early flush
+game_state_flush_size = 100
+
+# seconds after which idle games are removed from memory, and maximum number of games in memory
+game_state_idle_timeout = 3600
+game_state_max_games = 10000
+
+# maximum number of guesses that can be submitted with one batch request
+max_batch_guesses = 500
+
+# threads of the executors that async views offload blocking work to
+io_executor_workers = int(os.environ.get("SEMANTUS_IO_WORKERS", 32))
+cpu_executor_workers = int(os.environ.get("SEMANTUS_CPU_WORKERS", os.cpu_count() or 1))
+
+# salt of the deterministic pick of the daily target word (changing it changes all future puzzles)
+daily_salt = os.environ.get("SEMANTUS_DAILY_SALT", "semantus")
+
+# ranks whose similarities are published with the daily puzzle (see DailyPuzzle.metadata)
+daily_hint_ranks = [1, 10, 100, 1000]
+
+# load expensive resources (language model, ...) when the app starts
+warm_up = os.environ.get("SEMANTUS_WARM_UP", "1") == "1"
+
+# management commands that serve requests and therefore warm up as well (other
+# commands such as migrate start without loading anything)
+warm_up_commands = os.environ.get("SEMANTUS_WARM_UP_COMMANDS", "runserver,runworker").split(",")
@@ -0,0 +1,92 @@
+"""
+Signal handlers that keep precomputed data in sync with the database. They are
+connected in SemantusAppConfig.ready().
+"""
+
+import logging
+
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import friends, leaderboard, usernames
+from .authentication import invalidate_user
+from .models import Contact, Game, UserData
+from .ranking import ensure_rank_table
+from .settings import sqlite_pragmas
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Game)
+def prepare_rank_table(sender, instance, created, **kwargs):
+    """
+    Makes sure that the rank table of the target word exists as soon as a game is created
+    """
+    if not created:
+        return
+
+    row = instance.word_id.row
+
+    if row is None:
+        logger.warning("Target word of game %s is not in the embedding store", instance.game_id)
+        return
+
+    ensure_rank_table(row)
+
+
+@receiver(post_save, sender=UserData)
+@receiver(post_delete, sender=UserData)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Makes sure that authentication never serves outdated profiles of this worker
+    """
+    invalidate_user(instance.firebase_id)
+
+
+@receiver(post_save, sender=UserData)
+def add_taken_username(sender, instance, **kwargs):
+    """
+    Keeps the set of taken usernames of this worker up to date after signups
+    """
+    usernames.add(instance.username)
+
+
+@receiver(post_delete, sender=UserData)
+def release_username(sender, instance, **kwargs):
+    usernames.discard(instance.username)
+
+
+@receiver(post_save, sender=UserData)
+def update_leaderboard(sender, instance, **kwargs):
+    """
+    Moves users to their new position in the leaderboard when their points change
+    """
+    leaderboard.update_user(instance)
+
+
+@receiver(post_delete, sender=UserData)
+def remove_from_leaderboard(sender, instance, **kwargs):
+    leaderboard.remove_user(instance.pk)
+
+
+@receiver(post_save, sender=Contact)
+@receiver(post_delete, sender=Contact)
+def invalidate_contacts(sender, instance, **kwargs):
+    """
+    Makes sure that friend lists of both users are reloaded after a contact changes
+    """
+    friends.invalidate(instance.user1_id, instance.user2_id)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Applies sqlite_pragmas to new SQLite connections
+    """
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        for name, value in sqlite_pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value};")
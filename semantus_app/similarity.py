@@ -0,0 +1,154 @@
+"""
+The similarity engine is the single place where similarities between words are
+computed. All embeddings are normalized once, so the cosine similarity of two
+words is a single dot product and scoring many words against a target is a
+single matrix-vector product.
+"""
+
+import threading
+
+import numpy as np
+
+from .embeddings import QuantizedMatrix, get_store, normalize_rows
+
+# number of rows that are converted to float32 at once when scoring float16 or int8 matrices
+_CHUNK_SIZE = 65536
+
+
+class SimilarityEngine:
+    """
+    Computes cosine similarities on top of an EmbeddingStore
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+        # normalized stores are used as they are (memory-mapped and shared between workers)
+        if store.normalized:
+            self.vectors = store.matrix
+        else:
+            self.vectors = normalize_rows(store.matrix[:])
+
+    def unit_vector(self, word):
+        """
+        Returns:
+            vector: normalized float32 embedding of word or None if the word is unknown
+        """
+        row = self.store.row(word)
+
+        if row is None:
+            return None
+
+        vector = np.asarray(self.vectors[row], dtype=np.float32)
+
+        # dequantized int8 and float16 rows are only approximately normalized
+        norm = np.linalg.norm(vector)
+
+        return vector / norm if norm > 0 else vector
+
+    def similarity(self, target, word):
+        """
+        Returns:
+            similarity: cosine similarity of target and word or None if one of them is unknown
+        """
+        return self.similarities(target, [word])[0]
+
+    def similarities(self, target, words):
+        """
+        Scores many words against a target with a single NumPy call
+
+        Parameters:
+            target: target word
+            words: list of words to score
+
+        Returns:
+            similarities: list of cosine similarities (None for unknown words) in the order of words
+        """
+        target_vector = self.unit_vector(target)
+
+        if target_vector is None:
+            return [None] * len(words)
+
+        rows = [self.store.row(word) for word in words]
+        known = [row for row in rows if row is not None]
+
+        if not known:
+            return [None] * len(words)
+
+        scores = np.asarray(self.vectors[known], dtype=np.float32) @ target_vector
+
+        # the target itself scores exactly 1, also for rows of lower precision
+        scores[np.asarray(known) == self.store.row(target)] = 1.0
+        scores = iter(scores.tolist())
+
+        return [None if row is None else next(scores) for row in rows]
+
+    def similarities_to_all(self, target_vector):
+        """
+        Scores the whole vocabulary against a vector
+
+        Parameters:
+            target_vector: normalized float32 vector
+
+        Returns:
+            similarities: float32 array with one similarity per row of the store
+        """
+        if self.vectors.dtype == np.float32:
+            return self.vectors @ target_vector
+
+        # avoid converting the whole matrix to float32 at once
+        result = np.empty(len(self.vectors), dtype=np.float32)
+
+        for start in range(0, len(self.vectors), _CHUNK_SIZE):
+            stop = min(start + _CHUNK_SIZE, len(self.vectors))
+
+            # quantized rows are scored on their codes without dequantizing them
+            if isinstance(self.vectors, QuantizedMatrix):
+                result[start:stop] = self.vectors.dot(target_vector, start, stop)
+            else:
+                chunk = np.asarray(self.vectors[start:stop], dtype=np.float32)
+                result[start:stop] = chunk @ target_vector
+
+        return result
+
+
+def to_score(similarity):
+    """
+    Converts a cosine similarity into the score shown to players (GameGuesses.similarity)
+
+    Parameters:
+        similarity: cosine similarity between -1 and 1
+
+    Returns:
+        score: similarity in percent, rounded to two decimal places
+    """
+    return round(100 * similarity, 2)
+
+
+_engine = None
+_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Returns the similarity engine of this process and creates it on first use
+    or when a new version of the embedding store has been published.
+    """
+    global _engine
+
+    store = get_store()
+
+    if _engine is None or _engine.store is not store:
+        with _lock:
+            if _engine is None or _engine.store is not store:
+                _engine = SimilarityEngine(store)
+
+    return _engine
+
+
+def similarity(target, word):
+    return get_engine().similarity(target, word)
+
+
+def similarities(target, words):
+    return get_engine().similarities(target, words)
@@ -0,0 +1,212 @@
+"""
+Target words of new games. Whether a word makes a good target depends on how
+common it is and how well-populated its neighborhood is, which needs a pass over
+the whole vocabulary. This is done offline by the prepare_targets command:
+
+    1. the target_candidates most frequent words are scored (the embedding files
+       list words by frequency, so the row of a word approximates its frequency)
+    2. the nearest neighbors of every candidate are computed in batches with one
+       matrix product per batch; their mean similarity is the density of the
+       neighborhood, and they are saved as the rank table of the candidate
+    3. candidates are split into difficulty tiers and shuffled into one pool per tier
+
+Creating a game then takes the next word of a pool with one indexed lookup,
+and its rank table is already on disk.
+"""
+
+import numpy as np
+from django.db import transaction
+
+from .models import TargetPool, WordData
+from .ranking import save_rank_table
+from .settings import density_neighbors, difficulty_tiers, rank_table_size
+from .similarity import get_engine
+
+# candidates whose neighbors are computed with one matrix product
+_BATCH_SIZE = 256
+
+# rows of the vocabulary that are converted to float32 and scored at once
+_CHUNK_SIZE = 65536
+
+
+def nearest_neighbors(vectors, rows, k):
+    """
+    Computes the k nearest neighbors of several rows of a normalized matrix
+
+    Parameters:
+        vectors: normalized matrix (may be memory-mapped or quantized)
+        rows: rows whose neighbors are computed
+        k: number of neighbors
+
+    Returns:
+        neighbors: int32 array of shape (len(rows), k), ordered from most to least similar
+        scores: similarities of the neighbors
+    """
+    rows = np.asarray(rows)
+    queries = np.asarray(vectors[rows], dtype=np.float32)
+    k = min(k, len(vectors) - 1)
+
+    # running top-k of every query, merged with the scores of one chunk at a time
+    best_rows = np.empty((len(rows), 0), dtype=np.int64)
+    best_scores = np.empty((len(rows), 0), dtype=np.float32)
+
+    for start in range(0, len(vectors), _CHUNK_SIZE):
+        chunk = np.asarray(vectors[start : start + _CHUNK_SIZE], dtype=np.float32)
+        scores = queries @ chunk.T
+
+        # a word is not a neighbor of itself
+        own = (rows >= start) & (rows < start + len(chunk))
+        scores[np.flatnonzero(own), rows[own] - start] = -np.inf
+
+        candidates = np.concatenate(
+            [best_rows, np.broadcast_to(np.arange(start, start + len(chunk)), scores.shape)], axis=1
+        )
+        scores = np.concatenate([best_scores, scores], axis=1)
+
+        if scores.shape[1] > k:
+            keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            candidates = np.take_along_axis(candidates, keep, axis=1)
+            scores = np.take_along_axis(scores, keep, axis=1)
+
+        best_rows, best_scores = candidates, scores
+
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+
+    return (
+        np.take_along_axis(best_rows, order, axis=1).astype(np.int32),
+        np.take_along_axis(best_scores, order, axis=1),
+    )
+
+
+def assign_tiers(rows, densities, tiers=len(difficulty_tiers)):
+    """
+    Splits candidates into difficulty tiers of equal size. Frequent words with a
+    dense neighborhood are easy, rare words with a sparse neighborhood are hard.
+
+    Parameters:
+        rows: rows of the candidates (lower rows are more frequent)
+        densities: density of the neighborhood of each candidate
+
+    Returns:
+        tiers: tier of each candidate (0 = easiest)
+    """
+    rows = np.asarray(rows)
+    densities = np.asarray(densities)
+
+    # percentiles in [0, 1), higher = harder
+    rarity = np.argsort(np.argsort(rows, kind="stable"), kind="stable") / len(rows)
+    sparsity = np.argsort(np.argsort(-densities, kind="stable"), kind="stable") / len(rows)
+
+    difficulty = (rarity + sparsity) / 2
+    order = np.argsort(difficulty, kind="stable")
+
+    result = np.empty(len(rows), dtype=np.int16)
+    result[order] = np.arange(len(rows)) * tiers // len(rows)
+
+    return result
+
+
+def prepare(candidates, seed=None, progress=None):
+    """
+    Scores the most frequent words, saves their rank tables and rebuilds the target pools
+
+    Parameters:
+        candidates: number of most frequent words that are considered
+        seed: seed of the shuffle (random if None)
+        progress: function that is called with the number of scored candidates
+
+    Returns:
+        sizes: number of words per tier
+    """
+    engine = get_engine()
+    store = engine.store
+
+    words = list(
+        WordData.objects.filter(row__isnull=False, row__lt=len(store))
+        .order_by("row")
+        .values_list("id", "row")[:candidates]
+    )
+
+    if not words:
+        raise ValueError("WordData has no words in the embedding store.")
+
+    rows = np.array([row for _, row in words], dtype=np.int64)
+
+    densities = np.empty(len(rows), dtype=np.float32)
+
+    for start in range(0, len(rows), _BATCH_SIZE):
+        batch = rows[start : start + _BATCH_SIZE]
+        neighbors, scores = nearest_neighbors(
+            engine.vectors, batch, max(rank_table_size, density_neighbors)
+        )
+
+        densities[start : start + len(batch)] = scores[:, :density_neighbors].mean(axis=1)
+
+        for row, row_neighbors in zip(batch, neighbors):
+            save_rank_table(int(row), row_neighbors[:rank_table_size], store)
+
+        if progress is not None:
+            progress(start + len(batch))
+
+    tiers = assign_tiers(rows, densities)
+    rng = np.random.default_rng(seed)
+
+    positions = np.empty(len(rows), dtype=np.int64)
+    sizes = []
+
+    for tier in range(len(difficulty_tiers)):
+        members = np.flatnonzero(tiers == tier)
+        positions[members] = rng.permutation(len(members))
+        sizes.append(len(members))
+
+    with transaction.atomic():
+        WordData.objects.filter(difficulty__isnull=False).update(
+            difficulty=None, pool_position=None, density=None
+        )
+        WordData.objects.bulk_update(
+            [
+                WordData(
+                    pk=pk,
+                    difficulty=int(tier),
+                    pool_position=int(position),
+                    density=float(density),
+                )
+                for (pk, _), tier, position, density in zip(words, tiers, positions, densities)
+            ],
+            ["difficulty", "pool_position", "density"],
+            batch_size=1000,
+        )
+
+        TargetPool.objects.all().delete()
+        TargetPool.objects.bulk_create(
+            [TargetPool(difficulty=tier, size=size) for tier, size in enumerate(sizes)]
+        )
+
+    return sizes
+
+
+def next_target(difficulty):
+    """
+    Takes the next word of the pool of a difficulty tier
+
+    Parameters:
+        difficulty: index into difficulty_tiers
+
+    Returns:
+        word: WordData object or None if the pool has not been prepared
+    """
+    with transaction.atomic():
+        pool = (
+            TargetPool.objects.select_for_update()
+            .filter(difficulty=difficulty, size__gt=0)
+            .first()
+        )
+
+        if pool is None:
+            return None
+
+        position = pool.next_position
+        pool.next_position = (position + 1) % pool.size
+        pool.save(update_fields=["next_position"])
+
+    return WordData.objects.filter(difficulty=difficulty, pool_position=position).first()
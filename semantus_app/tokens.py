@@ -0,0 +1,228 @@
+"""
+Verification of firebase ID tokens. Verifying a token requires an RSA signature
+check against Google's public certificates, so verified tokens are cached until
+they expire and the certificates are fetched ahead of time instead of on the
+request path.
+
+The verifier class is configurable (see token_verifier in settings.py), which
+allows replacing firebase with FakeVerifier for local development and tests.
+"""
+
+import hashlib
+import threading
+import time
+
+import firebase_admin
+import requests
+from django.utils.module_loading import import_string
+from google.auth import exceptions, jwt
+
+from .caches import LRUCache
+from .settings import token_verifier, token_cache_size, fake_verifier_latency
+
+# public certificates that firebase ID tokens are signed with
+CERTS_URL = (
+    "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+)
+
+
+class InvalidToken(Exception):
+    """
+    Raised if a token cannot be verified
+    """
+
+
+class CertificateCache:
+    """
+    Keeps Google's signing certificates for as long as their Cache-Control header
+    allows and refreshes them in the background shortly before they expire.
+    """
+
+    def __init__(self, url=CERTS_URL, refresh_margin=300):
+        self.url = url
+        self.refresh_margin = refresh_margin
+
+        self._certs = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _fetch(self):
+        response = requests.get(self.url, timeout=10)
+        response.raise_for_status()
+
+        # e.g. "public, max-age=22371, must-revalidate, no-transform"
+        max_age = 3600
+        for directive in response.headers.get("Cache-Control", "").split(","):
+            name, _, value = directive.strip().partition("=")
+
+            if name == "max-age" and value.isdigit():
+                max_age = int(value)
+
+        with self._lock:
+            self._certs = response.json()
+            self._expires_at = time.time() + max_age
+            self._refreshing = False
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+
+            self._refreshing = True
+
+        def refresh():
+            try:
+                self._fetch()
+            except Exception:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def get(self):
+        """
+        Returns:
+            certs: dictionary that maps key ids to PEM certificates
+        """
+        now = time.time()
+
+        # certificates are missing or expired => fetch them on the request path
+        if self._certs is None or now >= self._expires_at:
+            self._fetch()
+
+        # certificates expire soon => fetch them before they are needed
+        elif now >= self._expires_at - self.refresh_margin:
+            self._refresh_in_background()
+
+        return self._certs
+
+    def prefetch(self):
+        self._fetch()
+
+
+class FirebaseVerifier:
+    """
+    Verifies firebase ID tokens locally with cached signing certificates. Performs
+    the same checks as firebase_admin.auth.verify_id_token.
+    """
+
+    def __init__(self):
+        self.project_id = firebase_admin.get_app().project_id
+        self.issuer = f"https://securetoken.google.com/{self.project_id}"
+        self.certificates = CertificateCache()
+
+    def verify(self, token):
+        """
+        Parameters:
+            token: firebase ID token
+
+        Returns:
+            claims: decoded claims of the token (including "uid")
+        """
+        try:
+            claims = jwt.decode(token, certs=self.certificates.get(), audience=self.project_id)
+        except (ValueError, exceptions.GoogleAuthError) as e:
+            raise InvalidToken(str(e))
+
+        if claims.get("iss") != self.issuer:
+            raise InvalidToken("Token has an invalid issuer.")
+
+        subject = claims.get("sub")
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise InvalidToken("Token has an invalid subject.")
+
+        claims["uid"] = subject
+        return claims
+
+    def prefetch(self):
+        self.certificates.prefetch()
+
+
+class FakeVerifier:
+    """
+    Local stand-in for firebase. Accepts tokens of the form "fake:<uid>" after
+    waiting for a configurable latency.
+    """
+
+    def __init__(self, latency=fake_verifier_latency, lifetime=3600):
+        self.latency = latency
+        self.lifetime = lifetime
+
+    def verify(self, token):
+        if self.latency:
+            time.sleep(self.latency)
+
+        prefix, _, uid = token.partition(":")
+
+        if prefix != "fake" or not uid:
+            raise InvalidToken("Token is not a fake token.")
+
+        return {"uid": uid, "sub": uid, "exp": int(time.time()) + self.lifetime}
+
+    def prefetch(self):
+        pass
+
+
+class CachingVerifier:
+    """
+    Caches the claims of verified tokens until the tokens expire. Tokens are keyed
+    by their hash so that raw tokens are not kept in memory.
+    """
+
+    def __init__(self, verifier, maxsize=token_cache_size):
+        self.verifier = verifier
+        self.cache = LRUCache("tokens", maxsize)
+
+    def verify(self, token):
+        key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        claims = self.cache.get(key)
+
+        if claims is None:
+            claims = self.verifier.verify(token)
+            expires_at = claims.get("exp")
+
+            # tokens without expiry would stay cached (and valid) forever
+            if not isinstance(expires_at, (int, float)) or expires_at <= time.time():
+                raise InvalidToken("Token is expired or has no expiry.")
+
+            self.cache.set(key, claims, expires_at=expires_at)
+
+        return claims
+
+    def prefetch(self):
+        self.verifier.prefetch()
+
+
+_verifier = None
+_lock = threading.Lock()
+
+
+def get_verifier():
+    """
+    Returns the token verifier of this process (see token_verifier in settings.py)
+    """
+    global _verifier
+
+    if _verifier is None:
+        with _lock:
+            if _verifier is None:
+                _verifier = CachingVerifier(import_string(token_verifier)())
+
+    return _verifier
+
+
+def verify_token(token):
+    """
+    Verifies a firebase ID token
+
+    Parameters:
+        token: firebase ID token
+
+    Returns:
+        claims: decoded claims of the token (including "uid")
+
+    Raises:
+        InvalidToken: if the token cannot be verified
+    """
+    return get_verifier().verify(token)
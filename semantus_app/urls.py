@@ -4,12 +4,34 @@ obtain a response and send this response back to the person who sent the request
 """
 
 from django.urls import path
-from .views import HomepageView, SignupView, LoginView, UsernameCheckView, JoinGameView
+from .views import (
+    HomepageView,
+    StatsView,
+    DailyView,
+    DailyGuessView,
+    SignupView,
+    LoginView,
+    UsernameCheckView,
+    JoinGameView,
+    GameView,
+    GameBatchView,
+    HintView,
+    LeaderboardView,
+    FriendsView,
+)
 
 urlpatterns = [
     path("", HomepageView.as_view(), name="homepage-view"),
+    path("stats/", StatsView.as_view(), name="stats"),
     path("signup/", SignupView.as_view(), name="signup"),
     path("check-username/", UsernameCheckView.as_view(), name="check-username"),
     path("login/", LoginView.as_view(), name="login"),
     path("join-game/", JoinGameView.as_view(), name="join-game"),
+    path("game/", GameView.as_view(), name="game"),
+    path("game/guesses/", GameBatchView.as_view(), name="game-guesses"),
+    path("game/hint/", HintView.as_view(), name="game-hint"),
+    path("leaderboard/", LeaderboardView.as_view(), name="leaderboard"),
+    path("friends/", FriendsView.as_view(), name="friends"),
+    path("daily/", DailyView.as_view(), name="daily"),
+    path("daily/guess/", DailyGuessView.as_view(), name="daily-guess"),
 ]
@@ -0,0 +1,85 @@
+"""
+Availability of usernames. UsernameCheckView is called on every keystroke of the
+signup form, so taken usernames are kept in memory (lowercased, since usernames
+are unique regardless of case) and most checks never touch the database.
+
+The set is loaded once per worker and reloaded every username_refresh_interval
+seconds, which picks up usernames taken or released through other workers.
+Signups of this worker are added right away (see signals.py). A username that
+has just been taken through another worker may still be reported as available;
+signup itself is protected by the unique constraint on Lower("username").
+"""
+
+import threading
+import time
+
+from django.db.models.functions import Lower
+
+from .models import UserData
+from .settings import username_refresh_interval
+
+_taken = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def normalize(username):
+    """
+    Returns:
+        key: case-insensitive form of a username
+    """
+    return username.lower()
+
+
+def lookup(username):
+    """
+    Returns:
+        queryset: users whose username equals username regardless of case. Unlike
+            username__iexact, the comparison can use the Lower("username") index.
+    """
+    return UserData.objects.annotate(username_lower=Lower("username")).filter(
+        username_lower=normalize(username)
+    )
+
+
+def _get_taken():
+    global _taken, _loaded_at
+
+    if _taken is not None and time.monotonic() - _loaded_at < username_refresh_interval:
+        return _taken
+
+    with _lock:
+        if _taken is None or time.monotonic() - _loaded_at >= username_refresh_interval:
+            _taken = {
+                normalize(username)
+                for username in UserData.objects.filter(username__isnull=False).values_list(
+                    "username", flat=True
+                )
+            }
+            _loaded_at = time.monotonic()
+
+    return _taken
+
+
+def is_taken(username):
+    """
+    Checks whether a username is taken without querying the database (except
+    for the periodic reload of the set of taken usernames)
+    """
+    return normalize(username) in _get_taken()
+
+
+def add(username):
+    """
+    Marks a username as taken (called when a user signs up or changes their username)
+    """
+    if _taken is not None and username:
+        _taken.add(normalize(username))
+
+
+def discard(username):
+    """
+    Marks a username as available again (called when a user is deleted)
+    """
+    if _taken is not None and username:
+        _taken.discard(normalize(username))
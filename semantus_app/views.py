@@ -5,21 +5,36 @@ data tables) and convert them to JSON format.
 """
 from rest_framework import status
 from rest_framework.views import APIView
+from adrf.views import APIView as AsyncAPIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from rest_framework.throttling import ScopedRateThrottle
 
-from django.db import IntegrityError
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django.utils.text import slugify
 
-import firebase_admin.auth as auth
-
-from .serializers import UserDataSerializer
-from .models import UserData, GameParticipants, GameGuesses, WordData
+from .serializers import fast_user_serializer
+from .models import Game, GameParticipants, UserData
+from .lemma_cache import get_cached_lemma, get_lemmas_async
+from .caches import all_stats
+from .authentication import authenticate_async
+from .executors import run_io, run_cpu
+from .similarity import similarities as get_similarities, to_score
+from .ranking import ranks as get_ranks
+from .broadcast import publish_async
+from .game_state import game_states
+from .settings import (
+    difficulty_tiers,
+    leaderboard_max_size,
+    max_batch_guesses,
+    rank_table_size,
+)
+from . import daily, friends, hints, leaderboard, targets, usernames
 
 import re
-import spacy
-import random
-import string
 
 """
 TODO: What requests do we need to support?
@@ -33,14 +48,12 @@ Personal Data Requests:
     - POST delete_user(firebase_token)
 
 Game Requests:
-    - GET get_daily()
     - POST new_multiplayer_game()
     - POST join_multiplayer_game()
 
 Friend Requests:
     - POST add_friend(firebase_token, username)
     - POST remove_friend(firebase_token, username)
-    - GET friend_list(firebase_token)
 """
 
 
@@ -57,6 +70,163 @@ class HomepageView(APIView):
         return Response(status=status.HTTP_200_OK)
 
 
+class StatsView(APIView):
+    """
+    Goal: Inspect hit/miss/eviction counters of the in-process caches of this worker.
+    Authentication: Not required, only available in DEBUG mode.
+    """
+
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, _):
+        if not settings.DEBUG:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        return Response(all_stats(), status=status.HTTP_200_OK)
+
+
+class DailyView(APIView):
+    """
+    Goal: Get the metadata of today's puzzle.
+    Authentication: Not required.
+
+    Responses are served from the precomputed puzzle and may be cached by
+    clients and proxies until midnight.
+    """
+
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request, *args, **kwargs):
+        puzzle = daily.get_puzzle(timezone.localdate())
+
+        return cached_response(request, puzzle, puzzle.metadata)
+
+
+class DailyGuessView(APIView):
+    """
+    Goal: Get the similarity and rank of a word for today's puzzle.
+    Authentication: Not required.
+    """
+
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request, *args, **kwargs):
+        word = request.query_params.get("word", None)
+
+        puzzle = daily.get_puzzle(timezone.localdate())
+
+        def lookup():
+            # anonymous requests never run spaCy or write to the database
+            lemmatized_word = get_cached_lemma(word) if word else None
+            similarity, rank = puzzle.lookup(lemmatized_word) if lemmatized_word else (None, None)
+
+            if similarity is None:
+                return None
+
+            return {"guess": lemmatized_word, "similarity": to_score(similarity), "rank": rank}
+
+        return cached_response(request, puzzle, lookup)
+
+
+def cached_response(request, puzzle, get_data):
+    """
+    Builds a response for the daily puzzle that clients and proxies may cache
+    until midnight. If the client already has the current version (If-None-Match),
+    the data is not computed at all. Error responses are not cached.
+
+    Parameters:
+        request: DRF request
+        puzzle: DailyPuzzle
+        get_data: function that returns the response data (None for unknown words)
+
+    Returns:
+        response: Response object with ETag and Cache-Control headers
+    """
+    if request.headers.get("If-None-Match") == puzzle.etag:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        data = get_data()
+
+        if data is None:
+            response = Response(
+                {"detail": "Unknown word provided."}, status=status.HTTP_400_BAD_REQUEST
+            )
+            patch_cache_control(response, no_store=True)
+
+            return response
+
+        response = Response(data, status=status.HTTP_200_OK)
+
+    response["ETag"] = puzzle.etag
+    patch_cache_control(response, public=True, max_age=daily.seconds_until(puzzle.day))
+
+    return response
+
+
+class LeaderboardView(APIView):
+    """
+    Goal: Get the leaderboard and the rank of the user.
+    Authentication: Required.
+
+    GET parameters:
+        scope: "global" (default) for the best users or "friends" for the user and their friends
+        n: number of users of the global leaderboard (at most leaderboard_max_size)
+    """
+
+    def get(self, request, *args, **kwargs):
+        scope = request.query_params.get("scope", "global")
+
+        try:
+            n = int(request.query_params.get("n", leaderboard_max_size))
+        except ValueError:
+            n = 0
+
+        if n < 1:
+            return Response(
+                {"detail": "Invalid input. n has to be a positive integer."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        n = min(n, leaderboard_max_size)
+
+        if scope == "friends":
+            entries = leaderboard.friends(request.user.pk)
+        elif scope == "global":
+            entries = leaderboard.top(n)
+        else:
+            return Response(
+                {"detail": "Invalid scope. Use 'global' or 'friends'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(
+            {"leaderboard": entries, "user": leaderboard.rank(request.user.pk)},
+            status=status.HTTP_200_OK,
+        )
+
+
+class FriendsView(APIView):
+    """
+    Goal: Get the friends, favorites and open friend requests of the user.
+    Authentication: Required.
+    """
+
+    def get(self, request, *args, **kwargs):
+        user_id = request.user.pk
+
+        return Response(
+            {
+                "friends": friends.friends(user_id),
+                "favorites": friends.favorites(user_id),
+                "requests": friends.pending_requests(user_id),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 class UsernameCheckView(APIView):
     """
     Goal: Check whether a username is available.
@@ -66,6 +236,10 @@ class UsernameCheckView(APIView):
     authentication_classes = []
     permission_classes = []
 
+    # anonymous clients are limited per IP address (see DEFAULT_THROTTLE_RATES)
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = "username_check"
+
     def get(self, request, *args, **kwargs):
         username = request.query_params.get("username", None)
 
@@ -84,7 +258,7 @@ class UsernameCheckView(APIView):
                 status=status.HTTP_200_OK,
             )
 
-        if UserData.objects.filter(username__iexact=username).exists():
+        if usernames.is_taken(username):
             return Response(
                 {"message": "Username ist vergeben"}, status=status.HTTP_200_OK
             )
@@ -95,9 +269,10 @@ class UsernameCheckView(APIView):
             )
 
 
-class LoginView(APIView):
+class AsyncFirebaseView(AsyncAPIView):
     """
-    Goal: Authenticate users using their firebase token.
+    Base class of async views. Users are authenticated inside the handlers with
+    authenticate_async, so that token verification does not block the event loop.
     """
 
     permission_classes = [
@@ -105,102 +280,53 @@ class LoginView(APIView):
     ]
     authentication_classes = []
 
-    def get(self, request, *args, **kwargs):
-        token = request.headers.get("Authorization")
-
-        # if no token is passed, we return a 401 error right away
-        if not token:
-            print("\nNo token provided!\n")
-            return Response(
-                {"detail": "Invalid input. Please provide a firebase token."},
-                status=status.HTTP_401_UNAUTHORIZED,
-            )
-
-        # otherwise, we try to verify the token using firebase
-        try:
-            decoded_token = auth.verify_id_token(token)
+    def get_authenticate_header(self, request):
+        # makes DRF answer with 401 instead of 403 if authentication fails
+        return "Bearer"
 
-            uid = decoded_token["uid"]
 
-            try:
-                user = UserData.objects.get(firebase_id=uid)
+class LoginView(AsyncFirebaseView):
+    """
+    Goal: Authenticate users using their firebase token.
+    """
 
-            except UserData.DoesNotExist:
-                return Response(
-                    {"detail": "User does not exist. Please sign up."},
-                    status=status.HTTP_404_NOT_FOUND,
-                )
+    async def get(self, request, *args, **kwargs):
+        user, _ = await authenticate_async(request)
 
-            serializer = UserDataSerializer(user)
+        return Response(fast_user_serializer.serialize(user), status=status.HTTP_200_OK)
 
-            return Response(serializer.data, status=status.HTTP_200_OK)
 
-        # if firebase authentication fails, we get an exception and return a 401 error to the user
-        except Exception:
-            return Response(
-                {"detail": "Invalid firebase token provided."},
-                status=status.HTTP_401_UNAUTHORIZED,
-            )
-
-
-class SignupView(APIView):
+class SignupView(AsyncFirebaseView):
     """
     Goal: Add new users to the database and validate their firebase token.
     """
 
-    permission_classes = [
-        AllowAny,
-    ]
-    authentication_classes = []
-
-    def post(self, request, *args, **kwargs):
-        token = request.headers.get("Authorization")
+    async def post(self, request, *args, **kwargs):
         username = request.query_params.get("username")
 
-        # if no token is passed, we return a 401 error right away
-        if not token:
-            print("\nNo token provided!\n")
-            return Response(
-                {"detail": "Invalid input. Please provide a firebase token."},
-                status=status.HTTP_401_UNAUTHORIZED,
-            )
-
-        # otherwise, we try to verify the token using firebase
-        try:
-            decoded_token = auth.verify_id_token(token)
-
-            uid = decoded_token["uid"]
+        # the user does not exist yet, so only the token is verified
+        _, claims = await authenticate_async(request, require_user=False)
 
-            try:
-                print(f"Creating user with username: {username}")
-                user = UserData.objects.create(firebase_id=uid, username=username)
+        uid = claims["uid"]
 
-            except IntegrityError:
-                return Response(
-                    {"detail": "User does already exist. Please log in."},
-                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                )
-
-            except Exception as e:
-                print(e)
-                return Response(
-                    {"detail": "Internal server error."},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
-
-            serializer = UserDataSerializer(user)
+        try:
+            user = await run_io(UserData.objects.create, firebase_id=uid, username=username)
 
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        except IntegrityError:
+            return Response(
+                {"detail": "User does already exist. Please log in."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
 
-        # if firebase authentication fails, we get an exception and return a 401 error to the user
         except Exception as e:
             print(e)
-
             return Response(
-                {"detail": "Invalid firebase token provided."},
-                status=status.HTTP_401_UNAUTHORIZED,
+                {"detail": "Internal server error."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+        return Response(fast_user_serializer.serialize(user), status=status.HTTP_201_CREATED)
+
 
 class JoinGameView(APIView):
     """
@@ -262,31 +388,48 @@ class JoinGameView(APIView):
 
         Request Parameters:
             - game_type: type of game to create (singleplayer, coop, versus)
+            - difficulty: difficulty of the target word (easy, medium, hard)
         """
-        # derive player_id from token (else return unauthorized)
-
-        # get game_type
+        # get game_type and difficulty of the target word
+        game_type = request.query_params.get("game_type", "coop")
+        difficulty = request.query_params.get("difficulty", "medium")
 
         # return 501 error if game_type is not singleplayer, coop or versus
+        if game_type not in ("singleplayer", "coop", "versus"):
+            return Response(
+                {"detail": "Game type is not supported."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+
+        if difficulty not in difficulty_tiers:
+            return Response(
+                {"detail": f"Invalid difficulty. Use one of {', '.join(difficulty_tiers)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         # check if user is already part of a game with the same game_type
 
         # if yes, return 409 error
 
-        # else create game
+        # take the next word of the prepared target pool (its rank table is already on disk)
+        word = targets.next_target(difficulty_tiers.index(difficulty))
 
-        # add user to GameParticipants table
+        if word is None:
+            return Response(
+                {"detail": "No target words available. Please run prepare_targets."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
 
-        # serialize game_id
+        # create game (with a time-ordered game_id, see ids.py) and add user to GameParticipants
+        with transaction.atomic():
+            game = Game.objects.create(game_type=game_type, creator_id=request.user, word_id=word)
+            GameParticipants.objects.create(game_id=game, user_id=request.user, best_guess=0)
 
-        # generate random game_id with 20 characters
-        game_id = "".join(
-            random.choice(string.ascii_letters + string.digits) for _ in range(20)
+        return Response(
+            {"game_id": game.game_id, "game_type": game_type, "difficulty": difficulty},
+            status=status.HTTP_201_CREATED,
         )
 
-        # return game_id
-        pass
-
 
 class InviteView(APIView):
     """
@@ -304,7 +447,7 @@ class InviteView(APIView):
     pass
 
 
-class GameView(APIView):
+class GameView(AsyncFirebaseView):
     """
     Goal: Get and modify game data
 
@@ -313,145 +456,325 @@ class GameView(APIView):
     POST request for modifying game state (i.e. adding a new word)
     """
 
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         game_id = request.query_params.get("game_id", None)
 
-        # obtain user from token
-        firebase_data = verify_firebase_token(request)
+        user, _ = await authenticate_async(request)
 
-        # return error if firebase authentication fails
-        if isinstance(firebase_data, Response):
-            return firebase_data
+        # check if user is part of current game and serialize game data if so
+        snapshot = await run_io(get_game_snapshot, user, game_id)
 
-        user_id, user = firebase_data
-
-        # check if user is part of current game based on GameParticipants table
-        try:
-            GameParticipants.objects.get(game_id=game_id, user_id=user.username)
-
-            # if yes, serialize game data and return it
+        if snapshot is not None:
+            return Response(snapshot, status=status.HTTP_200_OK)
 
         # else return unauthorized error
-        except GameParticipants.DoesNotExist:
-            return Response(
-                {"detail": "User is not part of this game."},
-                status=status.HTTP_401_UNAUTHORIZED,
-            )
+        return Response(
+            {"detail": "User is not part of this game."},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
 
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         game_id = request.query_params.get("game_id", None)
 
         # obtain game_id and word from request
         word = request.query_params.get("word", None)
 
-        # obtain user from token
-        firebase_data = verify_firebase_token(request)
+        user, _ = await authenticate_async(request)
 
-        # return error if firebase authentication fails
-        if isinstance(firebase_data, Response):
-            return firebase_data
+        # lemmatization and scoring run on the CPU executor, database work on the I/O executor
+        data, response_status, best = await submit_guess(user, game_id, word)
 
-        # otherwise, we get user_id and user
-        _, user = firebase_data
+        if response_status == status.HTTP_201_CREATED:
+            # push the guess to all participants that are connected via WebSocket
+            await publish_async(game_id, "guess", data)
 
-        try:
-            # make sure that user is part of current game based on GameParticipants table
-            GameParticipants.objects.get(game_id=game_id, user_id=user.username)
+            if best:
+                await publish_async(game_id, "best_guess", data)
 
-            # lemmatize word
-            language_model = spacy.load("de_core_news_sm")
-            doc = language_model(word)
+        return Response(data, status=response_status)
 
-            if len(doc) == 0:
-                return Response(
-                    {"detail": "Unknown word provided."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
 
-            lemmatized_word = doc[0].lemma_
+class HintView(AsyncFirebaseView):
+    """
+    Goal: Get a word that is closer to the target than the best guess of the user
 
-            # check if lemmatized_word is in WordData table
-            WordData.objects.get(word=lemmatized_word)
+    GET request with game_id and optionally rank (the rank bucket to start from)
+    """
 
-            # get word embeddings for lemmatized_word and target_word
+    async def get(self, request, *args, **kwargs):
+        game_id = request.query_params.get("game_id", None)
 
-            # compute similarity to target word
-            similarity = 0
+        try:
+            bucket = int(request.query_params["rank"]) if "rank" in request.query_params else None
+        except ValueError:
+            bucket = 0
 
-            # add word to GameGuesses table
-            guess = GameGuesses(
-                game_id=game_id,
-                user_id=user.username,
-                guess=lemmatized_word,
-                similarity=similarity,
+        # hints are picked from the rank table of the target
+        if bucket is not None and not 1 <= bucket <= rank_table_size:
+            return Response(
+                {"detail": f"Invalid input. The rank has to be between 1 and {rank_table_size}."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-            try:
-                # try to save new entry
-                guess.save()
+        user, _ = await authenticate_async(request)
+
+        data, response_status = await get_game_hint(user, game_id, bucket)
 
-                # serialize GameData
+        return Response(data, status=response_status)
 
-                # return GameData as part of response
 
-            # integrity error if word has already been guessed
-            except:
-                # serialize GameData
+class GameBatchView(AsyncFirebaseView):
+    """
+    Goal: Add many guesses to a game at once (e.g. when a client replays guesses
+    after a reconnect or syncs offline play)
 
-                # return GameData as part of response
+    POST request with body {"words": [...]}, the game is passed as game_id parameter
+    """
 
-                return Response(
-                    {"detail": "Word has already been guessed."},
-                    status=status.HTTP_409_CONFLICT,
-                )
+    async def post(self, request, *args, **kwargs):
+        game_id = request.query_params.get("game_id", None)
+        # the body may be any JSON value (e.g. a list instead of an object)
+        words = request.data.get("words", None) if isinstance(request.data, dict) else None
 
-        # user not found => unauthorized
-        except GameParticipants.DoesNotExist:
+        if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
             return Response(
-                {"detail": "User is not part of this game."},
-                status=status.HTTP_401_UNAUTHORIZED,
+                {"detail": "Invalid input. Please provide a list of words."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
+        if len(words) > max_batch_guesses:
+            return Response(
+                {"detail": f"Too many words. At most {max_batch_guesses} words are allowed."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        user, _ = await authenticate_async(request)
+
+        data, response_status, best = await submit_guesses(user, game_id, words)
+
+        if response_status == status.HTTP_200_OK:
+            created = [result for result in data["results"] if result["status"] == "created"]
+
+            # push all new guesses to the participants with a single event
+            if created:
+                await publish_async(game_id, "guesses", created)
+
+            if best is not None:
+                await publish_async(game_id, "best_guess", best)
+
+        return Response(data, status=response_status)
 
-def verify_firebase_token(request):
+
+def get_participant_state(user, game_id, refresh=False):
     """
-    Verifies the firebase token passed in the request header.
+    Returns the in-memory state of a game if the user takes part in it (runs on
+    the I/O executor, since unknown games and participants are loaded from the database)
+
+    Parameters:
+        refresh: pick up guesses written through other workers
 
     Returns:
-        - uid: Firebase user id
-        - user: UserData object
-        - Response object if an error occurs
+        state: GameState or None if the user is not part of the game
     """
-    # obtain user_id from token
-    token = request.headers.get("Authorization")
+    state = game_states.get(game_id) if game_id else None
 
-    # if no token is passed, we return a 401 error right away
-    if not token:
-        print("\nNo token provided!\n")
-        return Response(
-            {"detail": "Invalid input. Please provide a firebase token."},
-            status=status.HTTP_401_UNAUTHORIZED,
+    if state is None or not state.is_participant(user):
+        return None
+
+    if refresh:
+        state.refresh()
+
+    return state
+
+
+def get_game_snapshot(user, game_id):
+    """
+    Returns the state of a game (served from the in-memory game state)
+
+    Returns:
+        snapshot: game data or None if the user is not part of the game
+    """
+    state = get_participant_state(user, game_id, refresh=True)
+
+    return state.snapshot() if state is not None else None
+
+
+async def get_game_hint(user, game_id, bucket=None):
+    """
+    Picks a hint for a participant of a game (see hints.get_hint)
+
+    Returns:
+        data: response data
+        status: HTTP status of the response
+    """
+    state = await run_io(get_participant_state, user, game_id, refresh=True)
+
+    if state is None:
+        return {"detail": "User is not part of this game."}, status.HTTP_401_UNAUTHORIZED
+
+    user_guesses = [word for username, word, _ in list(state.guesses) if username == user.username]
+
+    # walking the rank table runs on the CPU executor
+    hint = await run_cpu(hints.get_hint, state.target, state.guessed, user_guesses, bucket)
+
+    if hint is None:
+        return {"detail": "No hint available."}, status.HTTP_404_NOT_FOUND
+
+    return hint, status.HTTP_200_OK
+
+
+def score_guesses(target, words):
+    """
+    Computes similarities and ranks of words with one vectorized call each (runs
+    on the CPU executor)
+
+    Returns:
+        similarities: list of cosine similarities (None for unknown words)
+        ranks: list of ranks among the nearest neighbors of target (None if not among them)
+    """
+    return get_similarities(target, words), get_ranks(target, words)
+
+
+async def submit_guess(user, game_id, word):
+    """
+    Adds a guess to a game. Database work runs on the I/O executor and only
+    lemmatization and scoring on the CPU executor, so a slow database does not
+    hold up the threads that score guesses.
+
+    Parameters:
+        user: UserData object
+        game_id: public id of the game (Game.game_id)
+        word: word as entered by the user
+
+    Returns:
+        data: response data
+        status: HTTP status of the response
+        best: whether the guess is the new best guess of the user
+    """
+    # make sure that user is part of current game (served from the in-memory game state)
+    state = await run_io(get_participant_state, user, game_id)
+
+    if state is None:
+        return (
+            {"detail": "User is not part of this game."},
+            status.HTTP_401_UNAUTHORIZED,
+            False,
         )
 
-    # otherwise, we try to verify the token using firebase
-    try:
-        decoded_token = auth.verify_id_token(token)
+    # lemmatize word
+    lemmatized_word = (await get_lemmas_async([word]))[0] if word else None
 
-        uid = decoded_token["uid"]
+    if lemmatized_word is None:
+        return {"detail": "Unknown word provided."}, status.HTTP_400_BAD_REQUEST, False
 
-        try:
-            user = UserData.objects.get(firebase_id=uid)
-            return uid, user
+    # check for duplicates before computing the similarity
+    if state.has_guess(lemmatized_word):
+        return {"detail": "Word has already been guessed."}, status.HTTP_409_CONFLICT, False
 
-        except UserData.DoesNotExist:
-            return Response(
-                {"detail": "User does not exist. Please sign up."},
-                status=status.HTTP_404_NOT_FOUND,
-            )
+    # similarity to the target word (None if the word is not in the vocabulary) and
+    # rank among the nearest neighbors of the target word (None if not among them)
+    similarities, ranks = await run_cpu(score_guesses, state.target, [lemmatized_word])
+    similarity, rank = similarities[0], ranks[0]
 
-    # if firebase authentication fails, we get an exception and return a 401 error to the user
-    except Exception:
-        return Response(
-            {"detail": "Invalid firebase token provided."},
-            status=status.HTTP_401_UNAUTHORIZED,
+    if similarity is None:
+        return {"detail": "Unknown word provided."}, status.HTTP_400_BAD_REQUEST, False
+
+    score = to_score(similarity)
+
+    # add word to the game (written to GameGuesses right away)
+    added, best = await run_io(state.add_guess, user, lemmatized_word, score)
+
+    # word has been guessed by another participant in the meantime (also through another worker)
+    if not added:
+        return {"detail": "Word has already been guessed."}, status.HTTP_409_CONFLICT, False
+
+    game_states.request_flush(state)
+
+    data = {
+        "username": user.username,
+        "guess": lemmatized_word,
+        "similarity": score,
+        "rank": rank,
+    }
+
+    return data, status.HTTP_201_CREATED, best
+
+
+async def submit_guesses(user, game_id, words):
+    """
+    Adds many guesses to a game. All words are lemmatized with one pass through
+    the lemma cache, scored with one vectorized similarity call and written with
+    a single bulk_create. Like submit_guess, only lemmatization and scoring run
+    on the CPU executor.
+
+    Parameters:
+        user: UserData object
+        game_id: public id of the game (Game.game_id)
+        words: list of words as entered by the user
+
+    Returns:
+        data: response data with one result per word ("created", "duplicate" or "unknown")
+        status: HTTP status of the response
+        best: data of the new best guess of the user or None
+    """
+    state = await run_io(get_participant_state, user, game_id)
+
+    if state is None:
+        return {"detail": "User is not part of this game."}, status.HTTP_401_UNAUTHORIZED, None
+
+    lemmas = await get_lemmas_async(words)
+
+    # only score each known, not yet guessed word once
+    candidates = list(
+        dict.fromkeys(
+            lemma for lemma in lemmas if lemma is not None and not state.has_guess(lemma)
         )
+    )
+    similarities, candidate_ranks = await run_cpu(score_guesses, state.target, candidates)
+    scores = dict(zip(candidates, similarities))
+
+    scored = [(word, to_score(score)) for word, score in scores.items() if score is not None]
+    ranks = dict(zip(candidates, candidate_ranks))
+
+    # words guessed by another participant in the meantime are not added
+    added, best = await run_io(state.add_guesses, user, scored)
+    created = {word: score for (word, score), is_added in zip(scored, added) if is_added}
+
+    game_states.request_flush(state)
+
+    results = []
+    reported = set()
+
+    for word, lemma in zip(words, lemmas):
+        result = {"word": word, "guess": lemma}
+
+        if lemma in created and lemma not in reported:
+            result.update(
+                status="created",
+                username=user.username,
+                similarity=created[lemma],
+                rank=ranks[lemma],
+            )
+            reported.add(lemma)
+
+        # words that were already guessed before the batch have not been scored
+        elif lemma is None or (lemma in scores and scores[lemma] is None):
+            result["status"] = "unknown"
+
+        else:
+            result["status"] = "duplicate"
+
+        results.append(result)
+
+    best_guess = None
+
+    if best:
+        word = max(created, key=created.get)
+        best_guess = {
+            "username": user.username,
+            "guess": word,
+            "similarity": created[word],
+            "rank": ranks[word],
+        }
+
+    return {"game_id": game_id, "results": results}, status.HTTP_200_OK, best_guess
@@ -2,6 +2,8 @@
 ASGI config for semantus_server project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests are served by Django, WebSocket connections by the consumers in
+semantus_app/routing.py.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
@@ -13,4 +15,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'semantus_server.settings')
 
-application = get_asgi_application()
+# initialize Django before importing consumers (they import models)
+django_asgi_application = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+
+from semantus_app.routing import websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter(
+    {
+        "http": django_asgi_application,
+        "websocket": URLRouter(websocket_urlpatterns),
+    }
+)
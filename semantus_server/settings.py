@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 import firebase_admin
 from firebase_admin import credentials
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
     "rest_framework.authtoken",
     "semantus_app.apps.SemantusAppConfig",
     "corsheaders",
+    "channels",
 ]
 
 MIDDLEWARE = [
@@ -79,17 +81,71 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "semantus_server.wsgi.application"
+ASGI_APPLICATION = "semantus_server.asgi.application"
+
+# Channel layer that fans out game events to WebSocket connections. The in-memory
+# layer only reaches connections of the same process, so deployments with several
+# workers set REDIS_URL to use a broker-backed layer (requires channels-redis).
+if os.environ.get("REDIS_URL"):
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [os.environ["REDIS_URL"]]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    }
 
 
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# The database is selected with SEMANTUS_DB:
+#   - "sqlite" (default): single-node deployments, runs in WAL mode with tuned
+#     pragmas (see sqlite_pragmas in semantus_app/settings.py)
+#   - "postgres": client/server database with persistent connections. Set
+#     SEMANTUS_DB_POOLER=1 when connecting through a transaction pooler
+#     (e.g. PgBouncer), which does not support server-side cursors.
+
+SEMANTUS_DB = os.environ.get("SEMANTUS_DB", "sqlite")
+
+if SEMANTUS_DB == "postgres":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("POSTGRES_DB", "semantus"),
+            "USER": os.environ.get("POSTGRES_USER", "semantus"),
+            "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+            "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+            "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+            # keep connections open between requests and check them before reuse
+            "CONN_MAX_AGE": int(os.environ.get("SEMANTUS_DB_CONN_MAX_AGE", 60)),
+            "CONN_HEALTH_CHECKS": True,
+            "DISABLE_SERVER_SIDE_CURSORS": os.environ.get("SEMANTUS_DB_POOLER") == "1",
+            "OPTIONS": {
+                "connect_timeout": 5,
+            },
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+            "OPTIONS": {
+                # seconds a connection waits for the write lock before failing
+                "timeout": 20,
+            },
+        }
     }
-}
+
+
+# covering indexes (Index.include) are only created on PostgreSQL, SQLite uses the plain index
+SILENCED_SYSTEM_CHECKS = ["models.W040"]
 
 
 # Password validation
@@ -115,10 +171,17 @@ firebase_admin.initialize_app(cred)
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework.authentication.TokenAuthentication",
         "semantus_app.authentication.FirebaseAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    "DEFAULT_RENDERER_CLASSES": (
+        "semantus_app.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_THROTTLE_RATES": {
+        # the username check is anonymous and called on every keystroke of the signup form
+        "username_check": os.environ.get("SEMANTUS_USERNAME_CHECK_RATE", "10/second"),
+    },
 }
 
 # AUTH_USER_MODEL = "semantus_app.UserData"